@@ -1,71 +1,14 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-from datetime import datetime
 import os
 
-# ============================================================================
-# MANUAL 50 QUESTIONS LIST - FORMAT PERINTAH
-# ============================================================================
-MANUAL_QUESTIONS = [
-    # A. ANALISIS DESKRIPTIF & EXPLORASI (1-15)
-    "Hitung total penjualan secara keseluruhan",
-    "Tampilkan rata-rata penjualan per bulan", 
-    "Cari produk terlaris berdasarkan jumlah transaksi",
-    "Identifikasi pelanggan dengan pembelian terbanyak",
-    "Hitung persentase pertumbuhan penjualan bulanan",
-    "Temukan nilai maksimum dan minimum dari setiap kolom numerik",
-    "Analisis distribusi penjualan berdasarkan kategori produk",
-    "Hitung rasio antara pelanggan baru dan pelanggan lama",
-    "Buat summary statistik lengkap dari dataset",
-    "Hitung total transaksi per kota atau region",
-    "Cari korelasi antara variabel numerik dalam dataset", 
-    "Deteksi outlier dalam data penjualan",
-    "Analisis tren penjualan berdasarkan timeline",
-    "Identifikasi variabel yang paling berpengaruh terhadap target",
-    "Bandingkan rata-rata penjualan antar kategori produk",
-    
-    # B. DATA PREPARATION & CLEANING (16-25)
-    "Baca dan tampilkan struktur dataset yang diupload",
-    "Hapus data duplikat dari dataset",
-    "Ganti nama kolom yang tidak deskriptif", 
-    "Ubah tipe data kolom yang tidak sesuai",
-    "Filter data berdasarkan kondisi tertentu",
-    "Gabungkan dataset dengan file external jika ada",
-    "Buat kolom baru hasil perhitungan atau transformasi",
-    "Lakukan encoding pada variabel kategorikal",
-    "Normalisasi data numerik untuk analisis lebih lanjut", 
-    "Ekspor dataset hasil cleaning ke file baru",
-    
-    # C. VISUALISASI DATA (26-40)
-    "Buat grafik batang untuk penjualan per produk",
-    "Buat grafik garis trend penjualan overtime", 
-    "Buat pie chart distribusi kategori produk",
-    "Buat heatmap korelasi antar variabel numerik",
-    "Buat scatter plot hubungan dua variabel numerik",
-    "Buat histogram distribusi nilai numerik",
-    "Buat box plot untuk analisis outlier",
-    "Buat bar chart horizontal perbandingan kategori", 
-    "Buat stacked bar chart komposisi penjualan",
-    "Buat area chart perkembangan kumulatif",
-    "Buat multiple subplot dalam satu layout",
-    "Buat dashboard interaktif sederhana",
-    "Ekspor visualisasi sebagai file gambar", 
-    "Buat laporan visual otomatis dari dataset",
-    "Buat comparative analysis chart antar segment",
-    
-    # D. ANALISIS LANJUTAN & INSIGHT (41-50)
-    "Buat segmentasi pelanggan berdasarkan RFM",
-    "Analisis pola pembelian pelanggan tertentu", 
-    "Identifikasi seasonality dalam data penjualan",
-    "Buat forecasting sederhana untuk periode berikutnya",
-    "Analisis customer lifetime value",
-    "Identifikasi produk yang sering dibeli bersama",
-    "Buat cohort analysis retention pelanggan", 
-    "Analisis sales funnel dan conversion rate",
-    "Buat performance benchmark antar periode",
-    "Generate actionable insights dari data"
-]
+import streamlit as st
+
+from config import Config
+from commands import MANUAL_QUESTIONS, COMMAND_CATEGORIES, COMMAND_PARAMS, CLEANING_COMMANDS, FILTER_COMMAND
+
+# Heavy dependencies (pandas, numpy, polars, openpyxl and the analysis engine)
+# are imported lazily inside the tab handlers, see dataset.py, pipeline.py,
+# filters.py and analysis.py.
+# Run `python benchmark_startup.py` to measure the cold start.
 
 # ============================================================================
 # STREAMLIT APP
@@ -87,6 +30,11 @@ def main():
     st.title("📊 InsightFlow Analytics Dashboard")
     st.markdown("Selamat datang! Upload file data Anda dan pilih perintah analisis dari 50 perintah yang tersedia.")
     
+    # Files of sessions that stop rerunning are removed by prune_session_files
+    from dataset import touch_folder
+    touch_folder(get_session_folder(Config.FILES_FOLDER))
+    touch_folder(get_session_folder(Config.EXPORT_FOLDER))
+    
     # Tab layout
     tab1, tab2, tab3 = st.tabs(["📋 Daftar Perintah", "📁 Upload Data", "🔍 Analisis Data"])
     
@@ -111,14 +59,7 @@ def show_questions_tab():
     """)
     
     # Display commands in expandable sections
-    categories = {
-        "Analisis Deskriptif & Eksplorasi (1-15)": MANUAL_QUESTIONS[0:15],
-        "Data Preparation & Cleaning (16-25)": MANUAL_QUESTIONS[15:25],
-        "Visualisasi Data (26-40)": MANUAL_QUESTIONS[25:40],
-        "Analisis Lanjutan & Insight (41-50)": MANUAL_QUESTIONS[40:50]
-    }
-    
-    for category, commands in categories.items():
+    for category, commands in COMMAND_CATEGORIES.items():
         with st.expander(f"📂 {category}"):
             for i, command in enumerate(commands, start=1):
                 st.write(f"**{i}.** {command}")
@@ -135,11 +76,34 @@ def show_upload_tab():
     
     if uploaded_file is not None:
         try:
-            # Read file
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
+            # Read file only once per upload; Streamlit reruns this script on every interaction
+            file_key = getattr(uploaded_file, 'file_id', uploaded_file.name)
+            if st.session_state.get('file_key') != file_key:
+                from dataset import read_dataset, save_upload, profile_dataset
+                
+                # Keep the raw file on disk; the cleaning plan is replayed on it lazily
+                source_path = save_upload(uploaded_file, get_session_folder(Config.FILES_FOLDER), file_key)
+                df = read_dataset(source_path)
+                profile = profile_dataset(df)
+                
+                # Store dataframe in session state
+                st.session_state.df = df
+                st.session_state.profile = profile
+                st.session_state.file_key = file_key
+                st.session_state.filename = uploaded_file.name
+                
+                st.session_state.source_path = source_path
+                st.session_state.schema_signature = None
+                
+                # Cleaned data, filter conditions and indexes belong to the previous file
+                st.session_state.dataset_cache = None
+                st.session_state.filters = []
+                
+                prune_session_files()
+            
+            df = st.session_state.df
+            profile = st.session_state.profile
+            st.session_state.file_uploaded = True
             
             st.success(f"✅ File berhasil diupload!")
             
@@ -150,11 +114,9 @@ def show_upload_tab():
             with col2:
                 st.metric("📈 Kolom", df.shape[1])
             with col3:
-                numeric_cols = df.select_dtypes(include=[np.number]).columns
-                st.metric("🔢 Numerik", len(numeric_cols))
+                st.metric("🔢 Numerik", len(profile['numeric_columns']))
             with col4:
-                categorical_cols = df.select_dtypes(include=['object']).columns
-                st.metric("📝 Kategorikal", len(categorical_cols))
+                st.metric("📝 Kategorikal", len(profile['categorical_columns']))
             
             # Data preview
             st.subheader("👀 Preview Data")
@@ -162,34 +124,15 @@ def show_upload_tab():
             
             # Column info
             st.subheader("📋 Informasi Kolom")
-            col_info = pd.DataFrame({
-                'Kolom': df.columns,
-                'Tipe Data': df.dtypes,
-                'Nilai Unik': [df[col].nunique() for col in df.columns],
-                'Nilai Hilang': [df[col].isnull().sum() for col in df.columns]
-            })
-            st.dataframe(col_info, use_container_width=True)
+            st.dataframe(profile['col_info'], use_container_width=True)
             
             # Data quality
             st.subheader("📊 Kualitas Data")
-            missing_percentage = (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
-            duplicated_rows = df.duplicated().sum()
-            
             col1, col2 = st.columns(2)
             with col1:
-                st.metric("📉 Nilai Hilang", f"{missing_percentage:.2f}%")
+                st.metric("📉 Nilai Hilang", f"{profile['missing_percentage']:.2f}%")
             with col2:
-                st.metric("🔄 Baris Duplikat", duplicated_rows)
-            
-            # Store dataframe in session state
-            st.session_state.df = df
-            st.session_state.file_uploaded = True
-            st.session_state.filename = uploaded_file.name
-            
-            # Store column types for analysis
-            st.session_state.numeric_columns = numeric_cols.tolist()
-            st.session_state.categorical_columns = categorical_cols.tolist()
-            st.session_state.date_columns = df.select_dtypes(include=['datetime64']).columns.tolist()
+                st.metric("🔄 Baris Duplikat", profile['duplicated_rows'])
             
         except Exception as e:
             st.error(f"❌ Error membaca file: {str(e)}")
@@ -197,6 +140,34 @@ def show_upload_tab():
         st.info("📁 Silakan upload file CSV atau Excel untuk memulai analisis")
         if 'file_uploaded' in st.session_state:
             st.session_state.file_uploaded = False
+            st.session_state.file_key = None
+    
+    show_attachment_upload()
+
+def show_attachment_upload():
+    """Upload secondary datasets for "Gabungkan dataset dengan file external" """
+    st.subheader("📎 Dataset Tambahan")
+    attached_files = st.file_uploader(
+        "Pilih file tambahan untuk digabungkan",
+        type=['csv', 'xlsx', 'parquet'],
+        accept_multiple_files=True,
+        help="Misalnya master pelanggan atau produk; digabungkan lewat perintah 'Gabungkan dataset'"
+    )
+    
+    # Files are only written to disk once; Streamlit reruns this on every interaction
+    saved = st.session_state.get('attachment_paths', {})
+    attachments = {}
+    for attached_file in attached_files or []:
+        file_key = getattr(attached_file, 'file_id', attached_file.name)
+        if file_key not in saved:
+            from dataset import save_upload
+            saved[file_key] = save_upload(attached_file, get_session_folder(Config.FILES_FOLDER), file_key)
+        attachments[os.path.splitext(attached_file.name)[0]] = saved[file_key]
+    
+    st.session_state.attachment_paths = saved
+    st.session_state.attachments = attachments
+    for name, path in attachments.items():
+        st.write(f"• **{name}** ({os.path.getsize(path) / 1024:,.1f} KB)")
 
 def show_analysis_tab():
     """Handle data analysis"""
@@ -206,7 +177,13 @@ def show_analysis_tab():
         st.warning("⚠️ Silakan upload file data terlebih dahulu di tab 'Upload Data'")
         return
     
-    df = st.session_state.df
+    try:
+        refresh_column_types()
+    except Exception as e:
+        # A replayed plan may reference columns the new file does not have
+        st.error(f"❌ Rencana cleaning tidak cocok dengan dataset ini: {str(e)}")
+        show_pipeline_panel()
+        return
     
     # Command selection
     st.subheader("🎯 Pilih Perintah Analisis")
@@ -220,10 +197,19 @@ def show_analysis_tab():
     # Additional parameters based on command type
     st.subheader("⚙️ Parameter Analisis")
     
-    command_lower = selected_command.lower()
+    params = COMMAND_PARAMS[selected_command]
+    cleaning_op = CLEANING_COMMANDS.get(selected_command)
+    numeric_column = None
+    categorical_column = None
+    
+    if cleaning_op:
+        cleaning_params = show_cleaning_params(cleaning_op)
+    elif selected_command == FILTER_COMMAND:
+        # A filter condition has the same shape as a cleaning filter step
+        filter_condition = show_cleaning_params('filter')
     
     # Dynamic parameter selection based on command type
-    if any(word in command_lower for word in ['hitung', 'tampilkan', 'rata', 'average', 'max', 'min', 'tren', 'total']):
+    if params['numeric']:
         # Commands about numeric data
         if st.session_state.numeric_columns:
             numeric_column = st.selectbox(
@@ -234,7 +220,7 @@ def show_analysis_tab():
             numeric_column = None
             st.warning("❌ Tidak ada kolom numerik dalam dataset")
     
-    if any(word in command_lower for word in ['cari', 'identifikasi', 'terlaris', 'terbanyak', 'top', 'distribusi', 'kelompok', 'kategori']):
+    if params['categorical']:
         # Commands about categorical data
         if st.session_state.categorical_columns:
             categorical_column = st.selectbox(
@@ -245,7 +231,7 @@ def show_analysis_tab():
             categorical_column = None
             st.warning("❌ Tidak ada kolom kategorikal dalam dataset")
     
-    if any(word in command_lower for word in ['korelasi']):
+    if params['correlation']:
         # Correlation analysis needs multiple numeric columns
         if len(st.session_state.numeric_columns) >= 2:
             st.info("🔗 Analisis korelasi akan membandingkan semua kolom numerik")
@@ -254,510 +240,465 @@ def show_analysis_tab():
     
     # Analysis button
     if st.button("🚀 Jalankan Perintah", type="primary", use_container_width=True):
-        with st.spinner("🔄 Menjalankan analisis..."):
+        if cleaning_op == 'export':
+            # Export reads the whole dataset (and runs partitioned merges), so it runs as a job
             try:
-                # Perform analysis based on command type
-                result = perform_analysis(df, selected_command, 
-                                        numeric_column if 'numeric_column' in locals() else None,
-                                        categorical_column if 'categorical_column' in locals() else None)
-                
-                # Display results
-                st.subheader("📊 Hasil Analisis")
-                st.success(f"**Perintah:** {selected_command}")
-                
-                if 'answer' in result:
-                    st.info(f"**Hasil:** {result['answer']}")
-                
-                if 'insights' in result:
-                    st.subheader("💡 Insights")
-                    for insight in result['insights']:
-                        st.write(f"• {insight}")
-                
-                if 'data' in result and result['data']:
-                    st.subheader("📈 Data Hasil")
-                    st.json(result['data'])
-                
-                if 'recommendations' in result:
-                    st.subheader("🎯 Rekomendasi")
-                    for rec in result['recommendations']:
-                        st.write(f"• {rec}")
-                    
+                submit_export_job(cleaning_params['file_format'])
             except Exception as e:
                 st.error(f"❌ Error dalam analisis: {str(e)}")
+        elif selected_command == FILTER_COMMAND:
+            # Counting matches needs the cleaned dataset, so it runs as a job
+            try:
+                submit_filter_job(filter_condition)
+            except Exception as e:
+                st.error(f"❌ Error dalam analisis: {str(e)}")
+        elif cleaning_op:
+            # Cleaning commands only edit the plan (schema checks and a short preview), so they run inline
+            with st.spinner("🔄 Menjalankan perintah..."):
+                try:
+                    result = run_cleaning_command(cleaning_op, cleaning_params)
+                    show_result(selected_command, result)
+                except Exception as e:
+                    st.error(f"❌ Error dalam analisis: {str(e)}")
+        else:
+            try:
+                submit_analysis_job(selected_command, numeric_column, categorical_column)
+            except Exception as e:
+                st.error(f"❌ Error dalam analisis: {str(e)}")
+    
+    show_jobs_panel()
+    show_filter_panel()
+    show_pipeline_panel()
 
-def perform_analysis(df, command, numeric_col=None, categorical_col=None):
-    """Perform analysis based on command type"""
-    command_lower = command.lower()
-    
-    # Basic pattern matching for different command types
-    if any(word in command_lower for word in ['hitung total', 'total']):
-        return handle_total_analysis(df, command, numeric_col)
-    elif any(word in command_lower for word in ['rata-rata', 'rata', 'average']):
-        return handle_average_analysis(df, command, numeric_col)
-    elif any(word in command_lower for word in ['maksimum', 'minimum', 'max', 'min']):
-        return handle_minmax_analysis(df, command, numeric_col)
-    elif any(word in command_lower for word in ['terlaris', 'terbanyak', 'top']):
-        return handle_top_analysis(df, command, categorical_col)
-    elif any(word in command_lower for word in ['tren', 'trend']):
-        return handle_trend_analysis(df, command, numeric_col)
-    elif any(word in command_lower for word in ['korelasi']):
-        return handle_correlation_analysis(df, command)
-    elif any(word in command_lower for word in ['distribusi']):
-        return handle_distribution_analysis(df, command, categorical_col, numeric_col)
-    elif any(word in command_lower for word in ['summary', 'statistik']):
-        return handle_summary_analysis(df, command)
-    elif any(word in command_lower for word in ['nilai hilang', 'missing']):
-        return handle_missing_analysis(df, command)
-    elif any(word in command_lower for word in ['duplikat', 'duplikasi']):
-        return handle_duplicate_analysis(df, command)
-    elif any(word in command_lower for word in ['outlier']):
-        return handle_outlier_analysis(df, command, numeric_col)
-    elif any(word in command_lower for word in ['visualisasi', 'grafik', 'chart']):
-        return handle_visualization_commands(df, command, numeric_col, categorical_col)
-    elif any(word in command_lower for word in ['segmentasi', 'rfm']):
-        return handle_segmentation_analysis(df, command)
-    else:
-        return handle_general_analysis(df, command)
-
-def handle_total_analysis(df, command, numeric_col):
-    """Handle total-related commands"""
-    if numeric_col:
-        total = df[numeric_col].sum()
-        return {
-            'answer': f'✅ Total {numeric_col}: {total:,.2f}',
-            'insights': [
-                f'📊 Total nilai pada kolom {numeric_col}: {total:,.2f}',
-                f'🔢 Berdasarkan {len(df)} baris data',
-                f'📈 Nilai rata-rata: {df[numeric_col].mean():,.2f}',
-                f'🎯 Nilai tertinggi: {df[numeric_col].max():,.2f}',
-                f'📉 Nilai terendah: {df[numeric_col].min():,.2f}'
-            ],
-            'data': {
-                'total': float(total),
-                'column': numeric_col,
-                'rows_analyzed': len(df),
-                'average': float(df[numeric_col].mean()),
-                'max': float(df[numeric_col].max()),
-                'min': float(df[numeric_col].min())
-            }
-        }
-    else:
-        return {
-            'answer': '❌ Tidak ada kolom numerik yang dipilih untuk analisis total',
-            'insights': ['Silakan pilih kolom numerik di parameter analisis'],
-            'recommendations': ['Pilih kolom numerik seperti "sales", "price", "quantity" dll.']
-        }
-
-def handle_average_analysis(df, command, numeric_col):
-    """Handle average-related commands"""
-    if numeric_col:
-        avg = df[numeric_col].mean()
-        median = df[numeric_col].median()
-        return {
-            'answer': f'✅ Rata-rata {numeric_col}: {avg:,.2f}',
-            'insights': [
-                f'📈 Rata-rata {numeric_col}: {avg:,.2f}',
-                f'📊 Median: {median:,.2f}',
-                f'🎯 Nilai tertinggi: {df[numeric_col].max():,.2f}',
-                f'📉 Nilai terendah: {df[numeric_col].min():,.2f}',
-                f'📋 Standar deviasi: {df[numeric_col].std():,.2f}',
-                f'🔢 Jumlah data: {len(df)} baris'
-            ],
-            'data': {
-                'average': float(avg),
-                'median': float(median),
-                'max': float(df[numeric_col].max()),
-                'min': float(df[numeric_col].min()),
-                'std': float(df[numeric_col].std()),
-                'count': len(df)
-            }
-        }
-    else:
-        return {
-            'answer': '❌ Tidak ada kolom numerik yang dipilih untuk analisis rata-rata',
-            'insights': ['Silakan pilih kolom numerik di parameter analisis'],
-            'recommendations': ['Pilih kolom numerik seperti "sales", "price", "quantity" dll.']
-        }
-
-def handle_minmax_analysis(df, command, numeric_col):
-    """Handle maximum/minimum analysis"""
-    if numeric_col:
-        max_val = df[numeric_col].max()
-        min_val = df[numeric_col].min()
-        max_idx = df[numeric_col].idxmax()
-        min_idx = df[numeric_col].idxmin()
-        
-        return {
-            'answer': f'✅ Nilai maksimum {numeric_col}: {max_val:,.2f}, minimum: {min_val:,.2f}',
-            'insights': [
-                f'📈 Nilai maksimum {numeric_col}: {max_val:,.2f}',
-                f'📉 Nilai minimum {numeric_col}: {min_val:,.2f}',
-                f'📊 Rentang nilai: {max_val - min_val:,.2f}',
-                f'📋 Rata-rata: {df[numeric_col].mean():,.2f}',
-                f'🔍 Maksimum pada baris: {max_idx + 1}',
-                f'🔍 Minimum pada baris: {min_idx + 1}'
-            ],
-            'data': {
-                'max_value': float(max_val),
-                'min_value': float(min_val),
-                'range': float(max_val - min_val),
-                'average': float(df[numeric_col].mean()),
-                'max_index': int(max_idx),
-                'min_index': int(min_idx)
-            }
-        }
-    else:
-        return {
-            'answer': '❌ Tidak ada kolom numerik yang dipilih untuk analisis maksimum/minimum',
-            'insights': ['Silakan pilih kolom numerik di parameter analisis']
-        }
-
-def handle_top_analysis(df, command, categorical_col):
-    """Handle top-related commands"""
-    if categorical_col:
-        top_items = df[categorical_col].value_counts().head(10)
-        total_categories = df[categorical_col].nunique()
-        
-        insights = [
-            f'🏆 Top 10 {categorical_col}:',
-            f'🥇 1. {top_items.index[0]} ({top_items.iloc[0]}x)',
-            f'🥈 2. {top_items.index[1]} ({top_items.iloc[1]}x)',
-            f'🥉 3. {top_items.index[2]} ({top_items.iloc[2]}x)',
-            f'📊 Total kategori: {total_categories}',
-            f'🔢 Total data points: {len(df)}'
-        ]
+def show_result(command, result):
+    """Display an analysis or cleaning result"""
+    st.subheader("📊 Hasil Analisis")
+    st.success(f"**Perintah:** {command}")
+    
+    if 'answer' in result:
+        st.info(f"**Hasil:** {result['answer']}")
+    
+    if 'insights' in result:
+        st.subheader("💡 Insights")
+        for insight in result['insights']:
+            st.write(f"• {insight}")
+    
+    if 'data' in result and result['data']:
+        st.subheader("📈 Data Hasil")
+        st.json(result['data'])
+    
+    if 'recommendations' in result:
+        st.subheader("🎯 Rekomendasi")
+        for rec in result['recommendations']:
+            st.write(f"• {rec}")
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+JOB_POLL_SECONDS = 1
+
+def get_session_id():
+    """Stable id of this browser session, for the shared job runner and per-session folders"""
+    if 'session_id' not in st.session_state:
+        import uuid
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+def get_session_folder(root):
+    """This session's folder under ``root``, so sessions never read or overwrite each other's files"""
+    return os.path.join(root, get_session_id())
+
+def prune_session_files():
+    """Remove stale files of every session: idle sessions' uploads and exports, unused join outputs"""
+    from dataset import prune_folders
+    from joins import prune_spill
+    
+    prune_folders(Config.FILES_FOLDER, Config.UPLOAD_TTL)
+    prune_folders(Config.EXPORT_FOLDER, Config.UPLOAD_TTL)
+    prune_spill(Config.SPILL_FOLDER, Config.SPILL_TTL)
+
+def run_analysis_job(job, cache, df, pipeline, source_path, filters,
+                     command, numeric_column, categorical_column):
+    """Job body; runs in a worker thread, so it must not touch st.session_state"""
+    from analysis import perform_analysis
+    
+    job.update_progress(0.0, "Menyiapkan dataset")
+    df, _ = prepare_dataset(cache, df, pipeline, source_path, filters, job.update_progress)
+    
+    # The analysis reports its stages into the rest of the progress bar
+    job.update_progress(0.3, f"Menganalisis {len(df):,} baris")
+    return perform_analysis(df, command, numeric_column, categorical_column,
+                            progress=lambda fraction, message: job.update_progress(0.3 + 0.7 * fraction, message))
+
+def run_export_job(job, pipeline, source_path, export_folder, filename, file_format):
+    """Job body for the export command; partitioned merges in the plan run here"""
+    from pipeline import handle_export_command, scan_dataset
+    
+    job.update_progress(0.1, "Menulis dataset hasil cleaning")
+    result = handle_export_command(pipeline, scan_dataset(source_path), export_folder, filename, file_format)
+    result['download'] = result['data']['path']
+    return result
+
+def submit_export_job(file_format):
+    """Queue an export of the cleaned dataset in the shared worker pool"""
+    from jobs import get_runner
+    
+    # Per-session folder so sessions exporting the same file name never overwrite each other
+    export_folder = get_session_folder(Config.EXPORT_FOLDER)
+    job = get_runner().submit(get_session_id(), f"Ekspor dataset ({file_format})", run_export_job,
+                              get_pipeline().copy(), st.session_state.source_path, export_folder,
+                              st.session_state.filename, file_format)
+    st.toast(f"🚀 Job {job.id} berjalan di latar belakang")
+    return job
+
+def submit_analysis_job(command, numeric_column, categorical_column):
+    """Queue an analysis of the current (filtered) dataset in the shared worker pool"""
+    from jobs import get_runner
+    
+    # Capture the inputs now; cleaning and filtering run inside the job, and
+    # the plan is copied so later edits do not change a queued job
+    filters = list(st.session_state.get('filters', []))
+    label = f"{command} (filter: {len(filters)} kondisi)" if filters else command
+    job = get_runner().submit(get_session_id(), label, run_analysis_job,
+                              get_dataset_cache(), st.session_state.df, get_pipeline().copy(),
+                              st.session_state.source_path, filters,
+                              command, numeric_column, categorical_column)
+    st.toast(f"🚀 Job {job.id} berjalan di latar belakang")
+    return job
+
+def show_jobs_panel():
+    """This session's analysis jobs; polls while any job is queued or running"""
+    from jobs import get_runner
+    
+    owner = get_session_id()
+    jobs = get_runner().jobs_for(owner)
+    if not jobs:
+        return
+    polling = any(job.active for job in jobs)
+    
+    @st.fragment(run_every=JOB_POLL_SECONDS if polling else None)
+    def jobs_panel():
+        runner = get_runner()
+        jobs = runner.jobs_for(owner)
+        if polling and not any(job.active for job in jobs):
+            # Everything has finished; one full rerun stops the polling
+            st.rerun()
         
-        # Add more items if available
-        if len(top_items) > 3:
-            for i in range(3, min(6, len(top_items))):
-                insights.append(f'{i+1}. {top_items.index[i]} ({top_items.iloc[i]}x)')
+        st.subheader("⏳ Job Analisis")
+        latest_done = next((job.id for job in reversed(jobs) if job.status == 'done'), None)
+        for job in reversed(jobs):
+            if job.active:
+                st.write(f"**{job.label}** · `{job.id}`")
+                st.progress(job.progress, text=f"{job.message} ({job.duration:.1f} detik)")
+                if st.button("⛔ Batalkan", key=f"cancel_{job.id}"):
+                    runner.cancel(job.id)
+                    st.rerun(scope="fragment")
+            elif job.status == 'done':
+                with st.expander(f"✅ {job.label} · {job.duration:.1f} detik", expanded=job.id == latest_done):
+                    show_result(job.label, job.result)
+                    if job.result.get('download') and os.path.exists(job.result['download']):
+                        with open(job.result['download'], 'rb') as f:
+                            st.download_button(
+                                "💾 Download Dataset Hasil Cleaning",
+                                data=f,
+                                file_name=os.path.basename(job.result['download']),
+                                key=f"download_{job.id}",
+                                on_click="ignore"
+                            )
+            elif job.status == 'failed':
+                st.error(f"❌ Error dalam analisis ({job.label}): {job.error}")
+            else:
+                st.write(f"🚫 {job.label} dibatalkan")
         
-        return {
-            'answer': f'✅ Top {categorical_col}: {top_items.index[0]} dengan {top_items.iloc[0]} occurrences',
-            'insights': insights,
-            'data': top_items.to_dict()
-        }
+        if st.button("🗑️ Bersihkan riwayat job", disabled=polling):
+            runner.forget(owner)
+            st.rerun()
+    
+    jobs_panel()
+
+# ============================================================================
+# CLEANING PIPELINE
+# ============================================================================
+def get_pipeline():
+    """Session cleaning plan; kept across uploads so it replays on a new file"""
+    if 'pipeline' not in st.session_state:
+        from pipeline import CleaningPipeline
+        st.session_state.pipeline = CleaningPipeline()
+    
+    pipeline = st.session_state.pipeline
+    pipeline.datasets = st.session_state.get('attachments', {})
+    pipeline.spill_dir = get_session_folder(Config.SPILL_FOLDER)
+    return pipeline
+
+def get_source():
+    """LazyFrame over the uploaded file"""
+    from pipeline import scan_dataset
+    return scan_dataset(st.session_state.source_path)
+
+def refresh_column_types():
+    """Update the column lists from the cleaning plan's schema (no rows are read)"""
+    pipeline = get_pipeline()
+    if not pipeline.steps:
+        types = dict(st.session_state.profile, columns=st.session_state.df.columns.tolist())
+    elif st.session_state.get('schema_signature') != pipeline.signature:
+        from pipeline import schema_column_types
+        types = schema_column_types(pipeline.apply(get_source()).collect_schema())
+        st.session_state.schema_signature = pipeline.signature
     else:
-        return {
-            'answer': '❌ Tidak ada kolom kategorikal yang dipilih untuk analisis top items',
-            'insights': ['Silakan pilih kolom kategorikal di parameter analisis'],
-            'recommendations': ['Pilih kolom seperti "product", "category", "region" dll.']
-        }
-
-def handle_trend_analysis(df, command, numeric_col):
-    """Handle trend-related commands"""
-    date_cols = df.select_dtypes(include=['datetime64']).columns
-    
-    if len(date_cols) > 0 and numeric_col:
-        date_col = date_cols[0]
-        # Simple trend analysis
-        if hasattr(df[date_col], 'dt'):
-            # Monthly trend
-            monthly_trend = df.groupby(df[date_col].dt.to_period('M'))[numeric_col].mean()
-            
-            insights = [
-                f'📈 Tren {numeric_col} per bulan:',
-                f'📅 Periode analisis: {len(monthly_trend)} bulan',
-                f'📊 Rata-rata overall: {df[numeric_col].mean():,.2f}',
-                f'🔍 Kolom tanggal: {date_col}',
-                f'📈 Nilai tertinggi: {monthly_trend.max():,.2f}',
-                f'📉 Nilai terendah: {monthly_trend.min():,.2f}'
-            ]
-            
-            return {
-                'answer': f'✅ Tren {numeric_col} berdasarkan waktu berhasil dianalisis',
-                'insights': insights,
-                'data': monthly_trend.to_dict()
-            }
+        return
+    
+    st.session_state.columns = types['columns']
+    st.session_state.numeric_columns = types['numeric_columns']
+    st.session_state.categorical_columns = types['categorical_columns']
+    st.session_state.date_columns = types['date_columns']
+
+def get_dataset_cache():
+    """This session's cleaned dataset and filter engine
+
+    A plain dict with its own lock instead of session state keys, so analysis
+    jobs can fill and reuse it from their worker thread.
+    """
+    if st.session_state.get('dataset_cache') is None:
+        import threading
+        st.session_state.dataset_cache = {'lock': threading.Lock(), 'building': {}}
+    return st.session_state.dataset_cache
+
+def get_cleaned_dataset(cache, pipeline, source_path, progress=None):
+    """The plan's output as pandas, materialized once per file and plan
+
+    The lock is only held to look up or publish the result, never during the
+    build; other callers wanting the same plan wait for the build in progress.
+    """
+    import threading
+    from pipeline import scan_dataset
+    
+    key = (source_path, pipeline.signature)
+    while True:
+        with cache['lock']:
+            if cache.get('clean_key') == key:
+                return cache['clean_df']
+            event = cache['building'].get(key)
+            if event is None:
+                event = cache['building'][key] = threading.Event()
+                break
+        # Another job is building it; keep checking for cancellation while waiting
+        while not event.wait(0.5):
+            if progress is not None:
+                progress(0.05, "Menunggu dataset yang sedang disiapkan job lain")
+    
+    try:
+        if progress is not None:
+            progress(0.05, "Menjalankan rencana cleaning")
+        clean_df = pipeline.collect(scan_dataset(source_path)).to_pandas()
+        with cache['lock']:
+            cache['clean_df'] = clean_df
+            cache['clean_key'] = key
+        return clean_df
+    finally:
+        with cache['lock']:
+            del cache['building'][key]
+        event.set()
+
+def prepare_dataset(cache, df, pipeline, source_path, filters, progress=None):
+    """Dataset with the cleaning plan and filters applied, and its filter engine
+
+    Uses only its arguments, so it runs inside background jobs.
+    """
+    from filters import FilterEngine
+    
+    if pipeline.steps:
+        df = get_cleaned_dataset(cache, pipeline, source_path, progress)
+    
+    with cache['lock']:
+        engine = cache.get('filter_engine')
+        if engine is None or engine.df is not df:
+            engine = cache['filter_engine'] = FilterEngine(df)
+        if filters and progress is not None:
+            progress(0.2, f"Menerapkan {len(filters)} filter")
+        return engine.view(filters), engine
+
+def show_cleaning_params(op):
+    """Parameter form for a cleaning command"""
+    from pipeline import (CAST_TYPES, FILTER_OPERATORS, DERIVE_OPERATORS,
+                          ENCODE_METHODS, NORMALIZE_METHODS, EXPORT_FORMATS, scan_dataset)
+    from joins import JOIN_TYPES
+    
+    columns = st.session_state.columns
+    numeric_columns = st.session_state.numeric_columns
+    
+    if op == 'drop_duplicates':
+        subset = st.multiselect("Kolom acuan duplikat (kosong = semua kolom):", options=columns)
+        return {'subset': subset}
+    
+    if op == 'rename':
+        column = st.selectbox("Pilih kolom:", options=columns)
+        new_name = st.text_input("Nama kolom baru:", value=column)
+        return {'mapping': {column: new_name}}
+    
+    if op == 'cast':
+        column = st.selectbox("Pilih kolom:", options=columns)
+        dtype = st.selectbox("Tipe data baru:", options=CAST_TYPES)
+        return {'column': column, 'dtype': dtype}
+    
+    if op == 'filter':
+        column = st.selectbox("Pilih kolom:", options=columns)
+        operator = st.selectbox("Kondisi:", options=FILTER_OPERATORS)
+        value = st.text_input("Nilai:")
+        return {'column': column, 'operator': operator, 'value': value}
+    
+    if op == 'derive':
+        name = st.text_input("Nama kolom baru:", value="kolom_baru")
+        left = st.selectbox("Kolom pertama:", options=numeric_columns)
+        operator = st.selectbox("Operasi:", options=DERIVE_OPERATORS)
+        if st.radio("Operand kedua:", options=["Kolom", "Angka"], horizontal=True) == "Kolom":
+            right = {'column': st.selectbox("Kolom kedua:", options=numeric_columns)}
         else:
-            return {
-                'answer': f'❌ Kolom {date_col} bukan tipe datetime yang valid',
-                'insights': ['Pastikan kolom tanggal dalam format yang benar']
-            }
-    
-    return {
-        'answer': '❌ Tidak cukup data untuk analisis tren',
-        'insights': [
-            'Diperlukan kolom tanggal dan kolom numerik',
-            f'Kolom tanggal tersedia: {len(date_cols)}',
-            f'Kolom numerik: {numeric_col if numeric_col else "Tidak dipilih"}'
-        ]
-    }
-
-def handle_correlation_analysis(df, command):
-    """Handle correlation analysis"""
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    if len(numeric_cols) >= 2:
-        correlation_matrix = df[numeric_cols].corr()
-        
-        # Get top correlation pairs
-        correlations = []
-        for i in range(len(numeric_cols)):
-            for j in range(i+1, len(numeric_cols)):
-                corr = correlation_matrix.iloc[i, j]
-                if not np.isnan(corr):
-                    correlations.append({
-                        'variables': f"{numeric_cols[i]} vs {numeric_cols[j]}",
-                        'correlation': float(corr),
-                        'strength': 'Kuat' if abs(corr) > 0.7 else 'Sedang' if abs(corr) > 0.3 else 'Lemah'
-                    })
-        
-        # Sort by absolute correlation
-        correlations.sort(key=lambda x: abs(x['correlation']), reverse=True)
-        
-        top_corr = correlations[0] if correlations else None
-        
-        insights = [
-            f'📈 Ditemukan {len(correlations)} pasangan korelasi',
-            f'🔗 Korelasi terkuat: {top_corr["variables"]} ({top_corr["correlation"]:.3f}) - {top_corr["strength"]}' if top_corr else 'Tidak ada korelasi yang signifikan',
-            f'📊 Total variabel numerik: {len(numeric_cols)}',
-            f'🔢 Skala korelasi: -1 (negatif sempurna) hingga +1 (positif sempurna)'
-        ]
-        
-        return {
-            'answer': f'✅ Analisis korelasi antara {len(numeric_cols)} variabel numerik',
-            'insights': insights,
-            'data': {
-                'top_correlations': correlations[:10],
-                'total_variables': len(numeric_cols),
-                'correlation_matrix_available': True
-            }
-        }
-    else:
-        return {
-            'answer': '❌ Tidak cukup kolom numerik untuk analisis korelasi',
-            'insights': ['Dibutuhkan minimal 2 kolom numerik untuk analisis korelasi'],
-            'recommendations': ['Pastikan dataset memiliki minimal 2 kolom numerik']
-        }
-
-def handle_distribution_analysis(df, command, categorical_col, numeric_col):
-    """Handle distribution analysis"""
-    if categorical_col and numeric_col:
-        distribution = df.groupby(categorical_col)[numeric_col].agg(['count', 'sum', 'mean', 'std']).round(2)
-        
-        insights = [
-            f'📊 Distribusi {numeric_col} berdasarkan {categorical_col}',
-            f'📈 Total kategori: {len(distribution)}',
-            f'🔢 Rata-rata overall: {df[numeric_col].mean():,.2f}',
-            f'📋 Kategori dengan nilai tertinggi: {distribution["mean"].idxmax()} ({distribution["mean"].max():,.2f})'
-        ]
-        
-        return {
-            'answer': f'✅ Distribusi {numeric_col} berdasarkan {categorical_col} berhasil dianalisis',
-            'insights': insights,
-            'data': distribution.to_dict()
-        }
-    else:
-        return {
-            'answer': '❌ Diperlukan kolom kategorikal dan numerik untuk analisis distribusi',
-            'insights': ['Silakan pilih kolom kategorikal dan numerik di parameter analisis']
-        }
-
-def handle_summary_analysis(df, command):
-    """Handle summary statistics"""
-    numeric_summary = df.describe()
-    categorical_summary = df.select_dtypes(include=['object']).describe()
-    
-    insights = [
-        f'📊 Dataset summary: {df.shape[0]} baris, {df.shape[1]} kolom',
-        f'🔢 Kolom numerik: {len(df.select_dtypes(include=[np.number]).columns)}',
-        f'📝 Kolom kategorikal: {len(df.select_dtypes(include=["object"]).columns)}',
-        f'📅 Kolom tanggal: {len(df.select_dtypes(include=["datetime64"]).columns)}',
-        f'📉 Nilai hilang: {df.isnull().sum().sum()} ({df.isnull().sum().sum()/(len(df)*len(df.columns))*100:.2f}%)'
-    ]
-    
-    return {
-        'answer': '✅ Summary statistik dataset berhasil dihasilkan',
-        'insights': insights,
-        'data': {
-            'shape': list(df.shape),
-            'numeric_columns': df.select_dtypes(include=[np.number]).columns.tolist(),
-            'categorical_columns': df.select_dtypes(include=['object']).columns.tolist(),
-            'missing_values': df.isnull().sum().to_dict(),
-            'data_types': df.dtypes.astype(str).to_dict()
-        }
-    }
-
-def handle_missing_analysis(df, command):
-    """Handle missing values analysis"""
-    missing_data = df.isnull().sum()
-    missing_percentage = (missing_data / len(df)) * 100
-    total_missing = missing_data.sum()
-    
-    insights = [
-        f'📊 Total nilai hilang: {total_missing}',
-        f'📉 Persentase nilai hilang: {total_missing/(len(df)*len(df.columns))*100:.2f}%',
-        f'🔍 Kolom dengan nilai hilang terbanyak: {missing_data.idxmax()} ({missing_data.max()} nilai)'
-    ]
-    
-    # Add details for columns with missing values
-    for col in missing_data[missing_data > 0].index:
-        insights.append(f'• {col}: {missing_data[col]} nilai hilang ({missing_percentage[col]:.2f}%)')
-    
-    return {
-        'answer': f'✅ Analisis nilai hilang: {total_missing} nilai hilang ditemukan',
-        'insights': insights,
-        'data': {
-            'total_missing': int(total_missing),
-            'missing_by_column': missing_data[missing_data > 0].to_dict(),
-            'missing_percentage': missing_percentage[missing_percentage > 0].to_dict()
-        }
-    }
-
-def handle_duplicate_analysis(df, command):
-    """Handle duplicate analysis"""
-    duplicate_rows = df.duplicated().sum()
-    duplicate_percentage = (duplicate_rows / len(df)) * 100
-    
-    insights = [
-        f'🔄 Baris duplikat: {duplicate_rows}',
-        f'📊 Persentase duplikat: {duplicate_percentage:.2f}%',
-        f'🔢 Total baris: {len(df)}'
-    ]
-    
-    if duplicate_rows > 0:
-        insights.append('💡 Disarankan untuk menghapus baris duplikat untuk analisis yang lebih akurat')
-    
-    return {
-        'answer': f'✅ Ditemukan {duplicate_rows} baris duplikat',
-        'insights': insights,
-        'data': {
-            'duplicate_rows': int(duplicate_rows),
-            'duplicate_percentage': float(duplicate_percentage),
-            'total_rows': len(df)
-        }
-    }
-
-def handle_outlier_analysis(df, command, numeric_col):
-    """Handle outlier analysis"""
-    if numeric_col:
-        Q1 = df[numeric_col].quantile(0.25)
-        Q3 = df[numeric_col].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        outliers = df[(df[numeric_col] < lower_bound) | (df[numeric_col] > upper_bound)]
-        outlier_count = len(outliers)
-        outlier_percentage = (outlier_count / len(df)) * 100
-        
-        insights = [
-            f'🎯 Outlier pada {numeric_col}: {outlier_count}',
-            f'📊 Persentase outlier: {outlier_percentage:.2f}%',
-            f'📈 Batas bawah: {lower_bound:.2f}',
-            f'📉 Batas atas: {upper_bound:.2f}',
-            f'📋 Q1: {Q1:.2f}, Q3: {Q3:.2f}, IQR: {IQR:.2f}'
-        ]
-        
-        return {
-            'answer': f'✅ Ditemukan {outlier_count} outlier pada {numeric_col}',
-            'insights': insights,
-            'data': {
-                'outlier_count': outlier_count,
-                'outlier_percentage': float(outlier_percentage),
-                'bounds': {'lower': float(lower_bound), 'upper': float(upper_bound)},
-                'quartiles': {'Q1': float(Q1), 'Q3': float(Q3), 'IQR': float(IQR)}
-            }
-        }
-    else:
-        return {
-            'answer': '❌ Tidak ada kolom numerik yang dipilih untuk analisis outlier',
-            'insights': ['Silakan pilih kolom numerik di parameter analisis']
-        }
-
-def handle_visualization_commands(df, command, numeric_col, categorical_col):
-    """Handle visualization-related commands"""
-    command_lower = command.lower()
-    
-    if any(word in command_lower for word in ['grafik batang', 'bar chart']):
-        if categorical_col and numeric_col:
-            return {
-                'answer': f'✅ Data untuk grafik batang {categorical_col} vs {numeric_col} siap',
-                'insights': [
-                    f'📊 Grafik batang: {categorical_col} vs {numeric_col}',
-                    f'📈 Total kategori: {df[categorical_col].nunique()}',
-                    f'🔢 Rata-rata {numeric_col}: {df[numeric_col].mean():,.2f}',
-                    '💡 Gunakan data di bawah untuk membuat visualisasi di Excel/Tableau'
-                ],
-                'data': df.groupby(categorical_col)[numeric_col].mean().to_dict()
-            }
-    
-    elif any(word in command_lower for word in ['grafik garis', 'line chart', 'tren']):
-        date_cols = df.select_dtypes(include=['datetime64']).columns
-        if len(date_cols) > 0 and numeric_col:
-            date_col = date_cols[0]
-            monthly_trend = df.groupby(df[date_col].dt.to_period('M'))[numeric_col].mean()
-            return {
-                'answer': f'✅ Data untuk grafik garis tren {numeric_col} siap',
-                'insights': [
-                    f'📈 Grafik garis: Tren {numeric_col} over time',
-                    f'📅 Periode: {len(monthly_trend)} bulan',
-                    f'🔍 Kolom tanggal: {date_col}',
-                    '💡 Data trend bulanan tersedia untuk visualisasi'
-                ],
-                'data': monthly_trend.to_dict()
-            }
-    
-    return {
-        'answer': '✅ Perintah visualisasi diterima',
-        'insights': [
-            '📊 Data untuk visualisasi telah dipersiapkan',
-            '💡 Gunakan data di bawah untuk membuat visualisasi di tools favorit Anda',
-            '🎨 Recommended tools: Excel, Tableau, Python matplotlib/seaborn'
-        ],
-        'data': {
-            'numeric_columns': st.session_state.numeric_columns,
-            'categorical_columns': st.session_state.categorical_columns,
-            'date_columns': st.session_state.date_columns
-        }
-    }
-
-def handle_segmentation_analysis(df, command):
-    """Handle segmentation analysis"""
-    # Simple RFM-like segmentation if we have customer data
-    customer_cols = [col for col in df.columns if any(word in col.lower() for word in ['customer', 'pelanggan', 'user', 'id'])]
-    amount_cols = [col for col in df.columns if any(word in col.lower() for word in ['amount', 'total', 'price', 'sales'])]
-    
-    if customer_cols and amount_cols:
-        customer_col = customer_cols[0]
-        amount_col = amount_cols[0]
+            right = {'value': st.number_input("Angka:", value=1.0)}
+        return {'name': name, 'left': left, 'operator': operator, 'right': right}
+    
+    if op == 'encode':
+        column = st.selectbox("Pilih kolom kategorikal:", options=st.session_state.categorical_columns)
+        method = st.selectbox("Metode encoding:", options=ENCODE_METHODS)
+        return {'column': column, 'method': method}
+    
+    if op == 'normalize':
+        column = st.selectbox("Pilih kolom numerik:", options=numeric_columns)
+        method = st.selectbox("Metode normalisasi:", options=NORMALIZE_METHODS)
+        return {'column': column, 'method': method}
+    
+    if op == 'merge':
+        attachments = st.session_state.get('attachments', {})
+        if not attachments:
+            st.warning("❌ Upload dataset tambahan terlebih dahulu di tab 'Upload Data'")
+            return None
+        dataset = st.selectbox("Dataset tambahan:", options=list(attachments))
+        right_columns = scan_dataset(attachments[dataset]).collect_schema().names()
+        left_on = st.multiselect("Kolom kunci dataset utama:", options=columns)
+        right_on = st.multiselect(f"Kolom kunci {dataset}:", options=right_columns)
+        how = st.selectbox("Jenis join:", options=JOIN_TYPES)
+        return {'dataset': dataset, 'left_on': left_on, 'right_on': right_on, 'how': how}
+    
+    file_format = st.selectbox("Format file:", options=EXPORT_FORMATS)
+    return {'file_format': file_format}
+
+def run_cleaning_command(op, params):
+    """Record a cleaning step (export runs as a job, see submit_export_job)"""
+    from pipeline import handle_cleaning_command, handle_merge_command
+    
+    pipeline = get_pipeline()
+    if op == 'merge':
+        if params is None:
+            raise ValueError("Belum ada dataset tambahan untuk digabungkan")
+        result = handle_merge_command(pipeline, get_source(), params, Config.JOIN_MEMORY_LIMIT)
+        refresh_column_types()
+        return result
+    
+    result = handle_cleaning_command(pipeline, get_source(), op, params)
+    refresh_column_types()
+    return result
+
+def show_pipeline_panel():
+    """Show the recorded cleaning plan with undo/reset and plan download/replay"""
+    from pipeline import CleaningPipeline, describe_step
+    
+    pipeline = get_pipeline()
+    with st.expander(f"🧹 Rencana Cleaning ({len(pipeline.steps)} langkah)"):
+        for i, step in enumerate(pipeline.steps, start=1):
+            st.write(f"**{i}.** {describe_step(step)}")
         
-        # Simple customer segmentation
-        customer_stats = df.groupby(customer_col).agg({
-            amount_col: ['count', 'sum', 'mean']
-        }).round(2)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("↩️ Batalkan langkah terakhir", disabled=not pipeline.steps):
+                pipeline.undo()
+                st.rerun()
+        with col2:
+            if st.button("🗑️ Reset rencana", disabled=not pipeline.steps):
+                pipeline.reset()
+                st.rerun()
+        with col3:
+            st.download_button("💾 Download rencana", data=pipeline.to_json(),
+                               file_name="cleaning_plan.json", mime="application/json",
+                               on_click="ignore")
         
-        insights = [
-            f'👥 Total pelanggan unik: {len(customer_stats)}',
-            f'💰 Total transaksi: {len(df)}',
-            f'📊 Rata-rata transaksi per pelanggan: {customer_stats[(amount_col, 'count')].mean():.1f}',
-            f'🎯 Pelanggan terbaik: {customer_stats[(amount_col, 'sum')].idxmax()}'
-        ]
+        plan_file = st.file_uploader("Jalankan ulang rencana dari file JSON", type=['json'])
+        plan_key = getattr(plan_file, 'file_id', None)
+        if plan_file is not None and st.session_state.get('plan_key') != plan_key:
+            try:
+                st.session_state.pipeline = CleaningPipeline.from_json(plan_file.getvalue().decode('utf-8'))
+                st.session_state.plan_key = plan_key
+                st.rerun()
+            except ValueError as e:
+                st.error(f"❌ Rencana tidak valid: {str(e)}")
+
+# ============================================================================
+# FILTER
+# ============================================================================
+def run_filter_job(job, cache, df, pipeline, source_path, filters):
+    """Job body for the filter command: index the cleaned dataset and count the matching rows"""
+    from filters import handle_filter_command
+    
+    job.update_progress(0.0, "Menyiapkan dataset")
+    _, engine = prepare_dataset(cache, df, pipeline, source_path, [], job.update_progress)
+    job.update_progress(0.5, "Menerapkan filter")
+    # The engine is shared with this session's other jobs
+    with cache['lock']:
+        return handle_filter_command(engine, filters)
+
+def submit_filter_job(condition):
+    """Activate a filter condition and count its rows in the shared worker pool
+
+    The condition is checked against the plan's schema first (no rows are
+    read), so an invalid column or value is rejected before it is active.
+    """
+    from filters import describe_condition
+    from jobs import get_runner
+    
+    pipeline = get_pipeline()
+    check = pipeline.copy()
+    check.add_step('filter', **condition)
+    check.apply(get_source()).collect_schema()
+    
+    filters = st.session_state.get('filters', []) + [condition]
+    job = get_runner().submit(get_session_id(), f"Filter: {describe_condition(condition)}", run_filter_job,
+                              get_dataset_cache(), st.session_state.df, pipeline.copy(),
+                              st.session_state.source_path, filters)
+    st.session_state.filters = filters
+    st.toast(f"🚀 Job {job.id} berjalan di latar belakang")
+    return job
+
+def show_filter_panel():
+    """Show the active filter conditions with clear / move-to-cleaning-plan actions"""
+    from filters import describe_condition
+    
+    filters = st.session_state.get('filters', [])
+    with st.expander(f"🔎 Filter Aktif ({len(filters)} kondisi)"):
+        if not filters:
+            st.write("Tidak ada filter. Gunakan perintah 'Filter data berdasarkan kondisi tertentu'.")
+            return
+        for i, condition in enumerate(filters, start=1):
+            st.write(f"**{i}.** {describe_condition(condition)}")
         
-        return {
-            'answer': '✅ Segmentasi pelanggan berhasil dianalisis',
-            'insights': insights,
-            'data': customer_stats.head(10).to_dict()
-        }
-    
-    return {
-        'answer': '❌ Data tidak cukup untuk analisis segmentasi pelanggan',
-        'insights': [
-            'Diperlukan kolom pelanggan/customer dan kolom amount/penjualan',
-            f'Kolom customer ditemukan: {len(customer_cols)}',
-            f'Kolom amount ditemukan: {len(amount_cols)}'
-        ]
-    }
-
-def handle_general_analysis(df, command):
-    """General analysis fallback with more specific responses"""
-    command_lower = command.lower()
-    
-    # More specific responses for common command types
-    if any(word in command_lower for word in ['prediksi', 'model', 'machine learning', 'forecasting']):
-        return {
-            'answer': '✅ Permintaan analisis prediktif diterima',
-            'insights': [
-                '🤖 Analisis prediktif membutuhkan modeling machine learning',
-                '📊 Untuk analisis dasar, gunakan perintah deskriptif',
-                '💡 Rekomendasi: Coba per
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🗑️ Hapus semua filter"):
+                st.session_state.filters = []
+                st.rerun()
+        with col2:
+            if st.button("🧹 Terapkan ke rencana cleaning", help="Filter ikut diekspor dan dijalankan ulang"):
+                from pipeline import handle_cleaning_command
+                
+                # Each condition is validated like a manually added step; stop at the first invalid one
+                pipeline = get_pipeline()
+                try:
+                    while filters:
+                        handle_cleaning_command(pipeline, get_source(), 'filter', filters[0])
+                        filters = filters[1:]
+                except Exception as e:
+                    st.error(f"❌ Kondisi {describe_condition(filters[0])} gagal diterapkan: {str(e)}")
+                st.session_state.filters = filters
+                refresh_column_types()
+                if not filters:
+                    st.rerun()
+
+if __name__ == "__main__":
+    main()
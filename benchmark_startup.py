@@ -0,0 +1,46 @@
+"""Measure the cold-start cost of the app module.
+
+Each run imports ``app`` in a fresh interpreter (what a new worker pays before
+the first paint) and reports the wall time plus which heavy libraries were
+pulled in. Usage: ``python benchmark_startup.py [runs]``.
+"""
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('pandas', 'numpy', 'polars', 'openpyxl', 'pyarrow', 'analysis')
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(f"{{elapsed:.4f}} {{','.join(loaded)}}")
+"""
+
+def measure(runs=5):
+    """Import time in seconds for each run, plus the heavy modules loaded"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    probe = PROBE.format(heavy=HEAVY_MODULES)
+    timings = []
+    loaded = ''
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', probe], cwd=here,
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+        timings.append(float(output[0]))
+        loaded = output[1] if len(output) > 1 else ''
+    return timings, loaded
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    timings, loaded = measure(runs)
+    timings.sort()
+    print(f"import app: best {timings[0] * 1000:.1f} ms, "
+          f"median {timings[len(timings) // 2] * 1000:.1f} ms over {runs} runs")
+    print(f"heavy modules loaded at startup: {loaded or 'none'}")
+
+if __name__ == "__main__":
+    main()
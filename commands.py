@@ -0,0 +1,111 @@
+"""Command catalogue: the 50 analyst commands and their UI metadata.
+
+Everything here is built once at import time. Streamlit re-executes ``app.py``
+on every interaction, but imported modules stay cached in ``sys.modules``.
+"""
+
+# ============================================================================
+# MANUAL 50 QUESTIONS LIST - FORMAT PERINTAH
+# ============================================================================
+MANUAL_QUESTIONS = (
+    # A. ANALISIS DESKRIPTIF & EXPLORASI (1-15)
+    "Hitung total penjualan secara keseluruhan",
+    "Tampilkan rata-rata penjualan per bulan", 
+    "Cari produk terlaris berdasarkan jumlah transaksi",
+    "Identifikasi pelanggan dengan pembelian terbanyak",
+    "Hitung persentase pertumbuhan penjualan bulanan",
+    "Temukan nilai maksimum dan minimum dari setiap kolom numerik",
+    "Analisis distribusi penjualan berdasarkan kategori produk",
+    "Hitung rasio antara pelanggan baru dan pelanggan lama",
+    "Buat summary statistik lengkap dari dataset",
+    "Hitung total transaksi per kota atau region",
+    "Cari korelasi antara variabel numerik dalam dataset", 
+    "Deteksi outlier dalam data penjualan",
+    "Analisis tren penjualan berdasarkan timeline",
+    "Identifikasi variabel yang paling berpengaruh terhadap target",
+    "Bandingkan rata-rata penjualan antar kategori produk",
+    
+    # B. DATA PREPARATION & CLEANING (16-25)
+    "Baca dan tampilkan struktur dataset yang diupload",
+    "Hapus data duplikat dari dataset",
+    "Ganti nama kolom yang tidak deskriptif", 
+    "Ubah tipe data kolom yang tidak sesuai",
+    "Filter data berdasarkan kondisi tertentu",
+    "Gabungkan dataset dengan file external jika ada",
+    "Buat kolom baru hasil perhitungan atau transformasi",
+    "Lakukan encoding pada variabel kategorikal",
+    "Normalisasi data numerik untuk analisis lebih lanjut", 
+    "Ekspor dataset hasil cleaning ke file baru",
+    
+    # C. VISUALISASI DATA (26-40)
+    "Buat grafik batang untuk penjualan per produk",
+    "Buat grafik garis trend penjualan overtime", 
+    "Buat pie chart distribusi kategori produk",
+    "Buat heatmap korelasi antar variabel numerik",
+    "Buat scatter plot hubungan dua variabel numerik",
+    "Buat histogram distribusi nilai numerik",
+    "Buat box plot untuk analisis outlier",
+    "Buat bar chart horizontal perbandingan kategori", 
+    "Buat stacked bar chart komposisi penjualan",
+    "Buat area chart perkembangan kumulatif",
+    "Buat multiple subplot dalam satu layout",
+    "Buat dashboard interaktif sederhana",
+    "Ekspor visualisasi sebagai file gambar", 
+    "Buat laporan visual otomatis dari dataset",
+    "Buat comparative analysis chart antar segment",
+    
+    # D. ANALISIS LANJUTAN & INSIGHT (41-50)
+    "Buat segmentasi pelanggan berdasarkan RFM",
+    "Analisis pola pembelian pelanggan tertentu", 
+    "Identifikasi seasonality dalam data penjualan",
+    "Buat forecasting sederhana untuk periode berikutnya",
+    "Analisis customer lifetime value",
+    "Identifikasi produk yang sering dibeli bersama",
+    "Buat cohort analysis retention pelanggan", 
+    "Analisis sales funnel dan conversion rate",
+    "Buat performance benchmark antar periode",
+    "Generate actionable insights dari data"
+)
+
+# ============================================================================
+# COMMAND METADATA
+# ============================================================================
+COMMAND_CATEGORIES = {
+    "Analisis Deskriptif & Eksplorasi (1-15)": MANUAL_QUESTIONS[0:15],
+    "Data Preparation & Cleaning (16-25)": MANUAL_QUESTIONS[15:25],
+    "Visualisasi Data (26-40)": MANUAL_QUESTIONS[25:40],
+    "Analisis Lanjutan & Insight (41-50)": MANUAL_QUESTIONS[40:50]
+}
+
+# Data preparation commands that record a step in the cleaning pipeline (see pipeline.py)
+CLEANING_COMMANDS = {
+    "Hapus data duplikat dari dataset": 'drop_duplicates',
+    "Ganti nama kolom yang tidak deskriptif": 'rename',
+    "Ubah tipe data kolom yang tidak sesuai": 'cast',
+    "Gabungkan dataset dengan file external jika ada": 'merge',
+    "Buat kolom baru hasil perhitungan atau transformasi": 'derive',
+    "Lakukan encoding pada variabel kategorikal": 'encode',
+    "Normalisasi data numerik untuk analisis lebih lanjut": 'normalize',
+    "Ekspor dataset hasil cleaning ke file baru": 'export'
+}
+
+# Adds a condition to the active filter; analyses then run on the filtered rows (see filters.py)
+FILTER_COMMAND = "Filter data berdasarkan kondisi tertentu"
+
+NUMERIC_KEYWORDS = ('hitung', 'tampilkan', 'rata', 'average', 'max', 'min', 'tren', 'total')
+CATEGORICAL_KEYWORDS = ('cari', 'identifikasi', 'terlaris', 'terbanyak', 'top', 'distribusi', 'kelompok', 'kategori')
+CORRELATION_KEYWORDS = ('korelasi',)
+
+def _command_params(command):
+    """Which parameter widgets a command needs"""
+    command_lower = command.lower()
+    if command in CLEANING_COMMANDS or command == FILTER_COMMAND:
+        # Cleaning and filter commands have their own parameter form
+        return {'numeric': False, 'categorical': False, 'correlation': False}
+    return {
+        'numeric': any(word in command_lower for word in NUMERIC_KEYWORDS),
+        'categorical': any(word in command_lower for word in CATEGORICAL_KEYWORDS),
+        'correlation': any(word in command_lower for word in CORRELATION_KEYWORDS)
+    }
+
+COMMAND_PARAMS = {command: _command_params(command) for command in MANUAL_QUESTIONS}
@@ -7,4 +7,13 @@ class Config:
     HOST = os.getenv('HOST', '0.0.0.0')
     DEBUG = os.getenv('DEBUG', True)
     UPLOAD_FOLDER = 'uploads'
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    FILES_FOLDER = os.path.join(UPLOAD_FOLDER, 'files')  # uploaded files, one folder per session
+    EXPORT_FOLDER = os.path.join(UPLOAD_FOLDER, 'exports')  # cleaned exports, one folder per session
+    UPLOAD_TTL = int(os.getenv('UPLOAD_TTL', 24 * 60 * 60))  # seconds an idle session's files are kept
+    SPILL_FOLDER = os.path.join(UPLOAD_FOLDER, 'spill')
+    JOIN_MEMORY_LIMIT = int(os.getenv('JOIN_MEMORY_LIMIT', 512 * 1024 * 1024))  # joins above this spill to disk
+    SPILL_TTL = int(os.getenv('SPILL_TTL', 24 * 60 * 60))  # seconds an unused spilled join output is kept
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', max(1, (os.cpu_count() or 2) // 2)))  # analyses running at once, server-wide
+    JOB_MAX_PER_SESSION = int(os.getenv('JOB_MAX_PER_SESSION', 2))
+    JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 60 * 60))  # seconds a finished job's result is kept
\ No newline at end of file
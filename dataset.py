@@ -0,0 +1,73 @@
+"""Dataset loading and profiling for the upload tab.
+
+pandas and polars are imported inside the functions so that importing this
+module costs nothing until a file is actually uploaded.
+"""
+import os
+
+def read_dataset(path):
+    """Read a saved upload into a pandas DataFrame
+
+    The file is read with the cleaning pipeline's scanner, so column types
+    (parsed dates in particular) are the same in the session dataset, the
+    cleaning plan and the filter engine.
+    """
+    from pipeline import scan_dataset
+
+    return scan_dataset(path).collect(engine='streaming').to_pandas()
+
+def touch_folder(path):
+    """Mark a session folder as in use so ``prune_folders`` keeps it"""
+    if os.path.isdir(path):
+        os.utime(path)
+
+def prune_folders(root, max_age):
+    """Remove the folders under ``root`` (one per session) untouched for ``max_age`` seconds"""
+    import shutil
+    import time
+
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age
+    for entry in os.scandir(root):
+        if entry.is_dir() and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+def save_upload(uploaded_file, folder, file_key):
+    """Write an uploaded file to disk so it can be scanned lazily by the cleaning pipeline"""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{file_key}_{os.path.basename(uploaded_file.name)}")
+    with open(path, 'wb') as f:
+        f.write(uploaded_file.getbuffer())
+    return path
+
+def column_types(df):
+    """Numeric, categorical and date column names of a DataFrame"""
+    import numpy as np
+
+    return {
+        'numeric_columns': df.select_dtypes(include=[np.number]).columns.tolist(),
+        'categorical_columns': df.select_dtypes(include=['object']).columns.tolist(),
+        'date_columns': df.select_dtypes(include=['datetime64']).columns.tolist()
+    }
+
+def profile_dataset(df):
+    """Column types, column info table and data quality numbers for a DataFrame"""
+    import pandas as pd
+
+    col_info = pd.DataFrame({
+        'Kolom': df.columns,
+        'Tipe Data': df.dtypes,
+        'Nilai Unik': [df[col].nunique() for col in df.columns],
+        'Nilai Hilang': [df[col].isnull().sum() for col in df.columns]
+    })
+
+    cells = len(df) * len(df.columns)
+    missing_percentage = (df.isnull().sum().sum() / cells) * 100 if cells else 0.0
+
+    return {
+        **column_types(df),
+        'col_info': col_info,
+        'missing_percentage': missing_percentage,
+        'duplicated_rows': int(df.duplicated().sum())
+    }
@@ -0,0 +1,246 @@
+"""Indexed filtering for "Filter data berdasarkan kondisi tertentu".
+
+A ``FilterEngine`` wraps the session dataset and builds per-column indexes on
+first use: a sorted index (row order by value) for numeric and date columns,
+answered by binary search, and a bitmap index (factorized codes plus cached
+per-category bitmaps) for categorical columns. Each condition yields a packed
+bitmap; conditions are ANDed and the combined bitmap is cached per filter
+combination, so repeated slicing by region or month does not rescan the data.
+Only the latest filtered view is kept as a copy of the rows.
+
+Conditions have the same shape as the cleaning pipeline's filter steps:
+``{'column': ..., 'operator': ..., 'value': ...}`` and select the same rows:
+values are parsed with ``pipeline.parse_filter_value`` for the column's type,
+and rows whose value is missing never match.
+"""
+import json
+import operator
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from pipeline import FILTER_OPERATORS, match_time_zone, parse_filter_value
+
+MAX_BITMAP_CATEGORIES = 4096
+MAX_CACHED_MASKS = 8
+
+_COMPARE = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le
+}
+
+def _to_bitmap(mask):
+    return np.packbits(mask)
+
+def _positions_to_bitmap(positions, n):
+    mask = np.zeros(n, dtype=bool)
+    mask[positions] = True
+    return _to_bitmap(mask)
+
+# ============================================================================
+# INDEXES
+# ============================================================================
+class SortedIndex:
+    """Row positions of a numeric/date column sorted by value"""
+    kind = 'sorted'
+
+    def __init__(self, series):
+        self.n = len(series)
+        self.is_datetime = pd.api.types.is_datetime64_any_dtype(series)
+        self.time_zone = str(series.dt.tz) if self.is_datetime and series.dt.tz is not None else None
+        valid = series.notna().to_numpy()
+        if self.time_zone is not None:
+            # Zoned values are indexed as naive UTC so numpy can compare them
+            values = series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()[valid]
+        elif self.is_datetime:
+            values = series.to_numpy()[valid]
+        else:
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+        order = np.argsort(values, kind='stable')
+        self.values = values[order]
+        self.positions = np.flatnonzero(valid)[order]
+
+    def _coerce(self, value):
+        if self.is_datetime:
+            value = pd.Timestamp(match_time_zone(parse_filter_value(value, 'datetime'), self.time_zone))
+            if value.tzinfo is not None:
+                value = value.tz_convert('UTC').tz_localize(None)
+            return value.to_datetime64()
+        return parse_filter_value(value, 'numeric')
+
+    def lookup(self, op, value):
+        """Packed bitmap of rows matching ``column <op> value``"""
+        if op == 'contains':
+            raise ValueError("Operator 'contains' hanya untuk kolom kategorikal")
+        value = self._coerce(value)
+        left = np.searchsorted(self.values, value, side='left')
+        right = np.searchsorted(self.values, value, side='right')
+        if op == '==':
+            positions = self.positions[left:right]
+        elif op == '!=':
+            positions = np.concatenate([self.positions[:left], self.positions[right:]])
+        elif op == '>':
+            positions = self.positions[right:]
+        elif op == '>=':
+            positions = self.positions[left:]
+        elif op == '<':
+            positions = self.positions[:left]
+        else:
+            positions = self.positions[:right]
+        return _positions_to_bitmap(positions, self.n)
+
+class BitmapIndex:
+    """Factorized codes of a categorical column with per-category bitmaps built on demand"""
+    kind = 'bitmap'
+
+    def __init__(self, series):
+        codes, categories = pd.factorize(series, use_na_sentinel=True)
+        self.n = len(series)
+        self.is_bool = pd.api.types.is_bool_dtype(series)
+        self.codes = codes.astype(np.min_scalar_type(-len(categories) - 1))
+        self.categories = [str(category) for category in categories]
+        self.lookup_code = {category: code for code, category in enumerate(self.categories)}
+        self.bitmaps = {}
+
+    def bitmap(self, code):
+        if code not in self.bitmaps:
+            self.bitmaps[code] = _to_bitmap(self.codes == code)
+        return self.bitmaps[code]
+
+    def lookup(self, op, value):
+        """Packed bitmap of rows matching ``column <op> value``"""
+        if self.is_bool:
+            if op == 'contains':
+                raise ValueError("Operator 'contains' hanya untuk kolom kategorikal")
+            value = str(parse_filter_value(value, 'bool'))
+        else:
+            value = parse_filter_value(value, 'string')
+        if op == '==':
+            code = self.lookup_code.get(value)
+            return self.bitmap(code) if code is not None else _to_bitmap(np.zeros(self.n, dtype=bool))
+
+        # Evaluate the condition once per category, then map back to rows
+        if op == 'contains':
+            matches = [code for code, category in enumerate(self.categories) if value in category]
+        else:
+            compare = _COMPARE[op]
+            matches = [code for code, category in enumerate(self.categories) if compare(category, value)]
+        if len(matches) == 1:
+            return self.bitmap(matches[0])
+        return _to_bitmap(np.isin(self.codes, matches))
+
+class ScanIndex:
+    """Fallback for high-cardinality columns: evaluates the condition on the column"""
+    kind = 'scan'
+
+    def __init__(self, series):
+        self.series = series
+
+    def lookup(self, op, value):
+        series = self.series
+        value = parse_filter_value(value, 'string')
+        if op == 'contains':
+            mask = series.astype(str).str.contains(value, regex=False)
+        else:
+            mask = _COMPARE[op](series.astype(str), value)
+        return _to_bitmap((mask & series.notna()).to_numpy(dtype=bool))
+
+def build_index(series):
+    """Pick the index type for a column"""
+    if pd.api.types.is_bool_dtype(series):
+        return BitmapIndex(series)
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+        return SortedIndex(series)
+    if series.nunique(dropna=True) <= MAX_BITMAP_CATEGORIES:
+        return BitmapIndex(series)
+    return ScanIndex(series)
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+class FilterEngine:
+    """Cached column indexes and filtered views over one DataFrame"""
+
+    def __init__(self, df):
+        self.df = df
+        self.indexes = {}
+        self.masks = OrderedDict()
+        self.latest = None
+
+    def index(self, column):
+        if column not in self.df.columns:
+            raise ValueError(f"Kolom filter tidak ditemukan: {column}")
+        if column not in self.indexes:
+            self.indexes[column] = build_index(self.df[column])
+        return self.indexes[column]
+
+    def mask(self, conditions):
+        """Packed bitmap of rows matching every condition, cached per condition set"""
+        key = json.dumps(conditions, sort_keys=True, default=str)
+        if key not in self.masks:
+            result = None
+            for condition in conditions:
+                if condition['operator'] not in FILTER_OPERATORS:
+                    raise ValueError(f"Operator filter tidak dikenal: {condition['operator']}")
+                bitmap = self.index(condition['column']).lookup(condition['operator'], condition['value'])
+                result = bitmap if result is None else np.bitwise_and(result, bitmap)
+            self.masks[key] = result
+            if len(self.masks) > MAX_CACHED_MASKS:
+                self.masks.popitem(last=False)
+        self.masks.move_to_end(key)
+        return key, self.masks[key]
+
+    def positions(self, conditions):
+        """Sorted positions of rows matching every condition"""
+        if not conditions:
+            return np.arange(len(self.df))
+        _, bitmap = self.mask(conditions)
+        return np.flatnonzero(np.unpackbits(bitmap, count=len(self.df)))
+
+    def view(self, conditions):
+        """Rows matching the conditions (original row labels kept); only the latest view is kept"""
+        if not conditions:
+            return self.df
+        key, bitmap = self.mask(conditions)
+        if self.latest is None or self.latest[0] != key:
+            positions = np.flatnonzero(np.unpackbits(bitmap, count=len(self.df)))
+            self.latest = (key, self.df.take(positions))
+        return self.latest[1]
+
+def describe_condition(condition):
+    return f"{condition['column']} {condition['operator']} {condition['value']}"
+
+def handle_filter_command(engine, conditions):
+    """Apply the active filter conditions and report how many rows match"""
+    start = time.perf_counter()
+    view = engine.view(conditions)
+    elapsed = (time.perf_counter() - start) * 1000
+    total = len(engine.df)
+
+    insights = [
+        f'🔎 Baris yang cocok: {len(view):,} dari {total:,} ({len(view) / total * 100 if total else 0:.2f}%)',
+        f'⚡ Waktu filter: {elapsed:,.1f} ms',
+        '📊 Semua perintah analisis sekarang dijalankan pada data hasil filter'
+    ]
+    if len(view) == 0:
+        insights.append('⚠️ Tidak ada baris yang cocok, analisis akan melaporkan 0 baris')
+    for condition in conditions:
+        kind = engine.index(condition['column']).kind
+        insights.append(f'🔸 {describe_condition(condition)} (indeks: {kind})')
+
+    return {
+        'answer': f'✅ Filter aktif: {" DAN ".join(describe_condition(c) for c in conditions)}',
+        'insights': insights,
+        'data': {
+            'conditions': conditions,
+            'matched_rows': len(view),
+            'total_rows': total,
+            'elapsed_ms': round(elapsed, 2)
+        }
+    }
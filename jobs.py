@@ -0,0 +1,161 @@
+"""Background job runner for long analyses.
+
+One ``JobRunner`` is shared by every session in the server process. Its thread
+pool has a fixed number of workers, which caps how many analyses run at once,
+and each session may only have a few jobs queued or running, so one user's
+heavy jobs cannot fill the pool. Jobs keep their result after they finish,
+so navigating between tabs (or any rerun) does not lose or restart them.
+
+Cancellation is cooperative: a queued job never starts, a running job stops at
+its next ``update_progress`` call, and a result that arrives after cancellation
+is discarded.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ACTIVE_STATES = ('queued', 'running')
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested"""
+
+class Job:
+    """One submitted analysis with its status, progress and result"""
+
+    def __init__(self, owner, label, fn, args, kwargs):
+        self.id = uuid.uuid4().hex[:8]
+        self.owner = owner
+        self.label = label
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = 'Menunggu worker'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._call = (fn, args, kwargs)
+        self._cancel = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATES
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def duration(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def update_progress(self, fraction, message=None):
+        """Report progress from inside the job; also the cancellation checkpoint"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+class JobRunner:
+    """Bounded worker pool shared by all sessions"""
+
+    def __init__(self, max_workers, max_per_owner, result_ttl):
+        self.max_per_owner = max_per_owner
+        self.result_ttl = result_ttl
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, owner, label, fn, *args, **kwargs):
+        """Queue ``fn(job, *args, **kwargs)`` and return its Job"""
+        with self.lock:
+            self._prune()
+            active = sum(1 for job in self.jobs.values() if job.owner == owner and job.active)
+            if active >= self.max_per_owner:
+                raise RuntimeError(f"Maksimal {self.max_per_owner} job aktif per sesi, tunggu atau batalkan job lain")
+            job = Job(owner, label, fn, args, kwargs)
+            self.jobs[job.id] = job
+            job.future = self.executor.submit(self._run, job)
+        return job
+
+    def _finish(self, job, status):
+        """Set a final status; ``finished`` is set first so a finished job always has it"""
+        with self.lock:
+            job.finished = time.time()
+            job.status = status
+
+    def _run(self, job):
+        fn, args, kwargs = job._call
+        # Drop references to the inputs (often a large DataFrame) once the job ends
+        job._call = None
+        if job.cancel_requested:
+            self._finish(job, 'cancelled')
+            return
+
+        job.started = time.time()
+        job.message = 'Berjalan'
+        job.status = 'running'
+        try:
+            result = fn(job, *args, **kwargs)
+            if job.cancel_requested:
+                self._finish(job, 'cancelled')
+            else:
+                job.result = result
+                job.progress = 1.0
+                job.message = 'Selesai'
+                self._finish(job, 'done')
+        except JobCancelled:
+            self._finish(job, 'cancelled')
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, 'failed')
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs are removed from the queue immediately"""
+        job = self.jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job._cancel.set()
+        job.message = 'Membatalkan...'
+        if job.future.cancel():
+            job._call = None
+            self._finish(job, 'cancelled')
+        return True
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def jobs_for(self, owner):
+        """Jobs of one session, oldest first"""
+        with self.lock:
+            return sorted((job for job in self.jobs.values() if job.owner == owner), key=lambda job: job.created)
+
+    def forget(self, owner):
+        """Drop a session's finished jobs and their results"""
+        with self.lock:
+            for job_id in [job.id for job in self.jobs.values() if job.owner == owner and not job.active]:
+                del self.jobs[job_id]
+
+    def _prune(self):
+        """Drop finished jobs whose results are older than the TTL"""
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job.id for job in self.jobs.values()
+                       if not job.active and job.finished is not None and job.finished < cutoff]:
+            del self.jobs[job_id]
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def get_runner():
+    """Process-wide runner, created on first use from Config"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            from config import Config
+            _runner = JobRunner(Config.JOB_WORKERS, Config.JOB_MAX_PER_SESSION, Config.JOB_RESULT_TTL)
+        return _runner
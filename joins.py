@@ -0,0 +1,258 @@
+"""Join engine for "Gabungkan dataset dengan file external".
+
+Joins run on polars LazyFrames. When the smaller side fits in the memory
+budget a plain hash join is used and fused into the cleaning plan. Otherwise
+both sides are hash-partitioned on the join keys into parquet files on disk
+and each partition pair is joined on its own (a grace hash join), so only one
+partition has to fit in memory at a time.
+
+Key columns whose dtypes differ (Int32 vs Int64, Categorical vs String) are
+cast to a common type on both sides first; otherwise equal keys would hash
+into different partitions.
+
+Partitioned outputs are cached per plan under the session's spill folder. A
+build happens in a temporary folder under a per-folder lock and is renamed
+into place when complete, so concurrent runs never see or delete each
+other's partial output. ``prune_spill`` removes outputs that have not been
+used for a while.
+
+polars is imported inside the functions to keep the app's cold start light.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+JOIN_TYPES = ('inner', 'left', 'full')
+JOIN_STRATEGIES = ('hash', 'partitioned')
+
+PARTITION_COLUMN = '__partition'
+MIN_PARTITIONS = 2
+MAX_PARTITIONS = 256
+
+# Rough in-memory width per value, used to estimate how big a side is
+STRING_BYTES = 32
+DEFAULT_BYTES = 8
+
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+# ============================================================================
+# KEYS
+# ============================================================================
+def _key_dtype(left, right):
+    """Common dtype two join key columns are compared in"""
+    import polars as pl
+
+    if left == right:
+        return left
+    if left.is_integer() and right.is_integer():
+        return pl.Int64
+    if left.is_numeric() and right.is_numeric():
+        return pl.Float64
+    if left in (pl.String, pl.Categorical) and right in (pl.String, pl.Categorical):
+        return pl.String
+    raise ValueError(f"Tipe kolom kunci tidak cocok: {left} dan {right}")
+
+def align_keys(left, right, left_on, right_on):
+    """Cast the key columns of both sides to a common dtype per key pair"""
+    import polars as pl
+
+    left_schema = left.collect_schema()
+    right_schema = right.collect_schema()
+    left_casts, right_casts = [], []
+    for left_key, right_key in zip(left_on, right_on):
+        dtype = _key_dtype(left_schema[left_key], right_schema[right_key])
+        if left_schema[left_key] != dtype:
+            left_casts.append(pl.col(left_key).cast(dtype))
+        if right_schema[right_key] != dtype:
+            right_casts.append(pl.col(right_key).cast(dtype))
+    if left_casts:
+        left = left.with_columns(left_casts)
+    if right_casts:
+        right = right.with_columns(right_casts)
+    return left, right
+
+# ============================================================================
+# STATISTICS
+# ============================================================================
+def _key_counts(lf, keys, names, count_name):
+    """Rows per distinct key, with key columns renamed to ``names``"""
+    import polars as pl
+
+    return (lf.group_by([pl.col(key).alias(name) for key, name in zip(keys, names)])
+              .agg(pl.len().alias(count_name)))
+
+def join_stats(left, right, left_on, right_on):
+    """Cardinality and unmatched-key counts of a join, from per-key row counts only"""
+    import polars as pl
+
+    left, right = align_keys(left, right, left_on, right_on)
+    left_counts = _key_counts(left, left_on, left_on, '__left')
+    right_counts = _key_counts(right, right_on, left_on, '__right')
+    counts = left_counts.join(right_counts, on=left_on, how='full', coalesce=True)
+
+    in_left = pl.col('__left').is_not_null()
+    in_right = pl.col('__right').is_not_null()
+    matched = in_left & in_right
+    stats = counts.select(
+        pl.col('__left').sum().alias('left_rows'),
+        pl.col('__right').sum().alias('right_rows'),
+        in_left.sum().alias('left_keys'),
+        in_right.sum().alias('right_keys'),
+        matched.sum().alias('matched_keys'),
+        (in_left & ~in_right).sum().alias('unmatched_left_keys'),
+        (in_right & ~in_left).sum().alias('unmatched_right_keys'),
+        pl.col('__left').filter(~in_right).sum().alias('unmatched_left_rows'),
+        pl.col('__right').filter(~in_left).sum().alias('unmatched_right_rows'),
+        (pl.col('__left') * pl.col('__right')).filter(matched).sum().alias('matched_rows'),
+        pl.col('__left').max().alias('max_left_per_key'),
+        pl.col('__right').max().alias('max_right_per_key')
+    ).collect(engine='streaming').row(0, named=True)
+
+    stats = {name: int(value or 0) for name, value in stats.items()}
+    left_side = 'N' if stats['max_left_per_key'] > 1 else '1'
+    right_side = 'N' if stats['max_right_per_key'] > 1 else '1'
+    stats['cardinality'] = f"{left_side}:{right_side}"
+    return stats
+
+def estimated_rows(stats, how):
+    """Output row count of a join, from ``join_stats``"""
+    rows = stats['matched_rows']
+    if how in ('left', 'full'):
+        rows += stats['unmatched_left_rows']
+    if how == 'full':
+        rows += stats['unmatched_right_rows']
+    return rows
+
+def estimate_bytes(schema, rows):
+    """Approximate in-memory size of ``rows`` rows with the given schema"""
+    import polars as pl
+
+    row_bytes = sum(STRING_BYTES if dtype == pl.String else DEFAULT_BYTES for dtype in schema.dtypes())
+    return rows * row_bytes
+
+def plan_join(left_bytes, right_bytes, memory_limit):
+    """Pick the join strategy and partition count for the given input sizes"""
+    build_bytes = min(left_bytes, right_bytes)
+    if build_bytes <= memory_limit:
+        return 'hash', 1
+    # Aim for partitions that use about half the budget each
+    partitions = -(-build_bytes // max(memory_limit // 2, 1))
+    return 'partitioned', int(min(max(partitions, MIN_PARTITIONS), MAX_PARTITIONS))
+
+# ============================================================================
+# EXECUTION
+# ============================================================================
+def plan_key(left, right, left_on, right_on, how, partitions):
+    """Cache key for a partitioned join's output
+
+    The unoptimized plans name the scanned files, so both sides must be
+    scanned from disk (see ``pipeline.scan_dataset``), not built in memory.
+    """
+    text = json.dumps([left.explain(optimized=False), right.explain(optimized=False),
+                       left_on, right_on, how, partitions])
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def join(left, right, left_on, right_on, how='inner', strategy='hash', spill_dir=None, partitions=1):
+    """Join two LazyFrames with the given strategy and return a LazyFrame"""
+    if how not in JOIN_TYPES:
+        raise ValueError(f"Jenis join tidak didukung: {how}")
+    if len(left_on) != len(right_on) or not left_on:
+        raise ValueError("Jumlah kolom kunci kiri dan kanan harus sama")
+
+    left, right = align_keys(left, right, left_on, right_on)
+    if strategy == 'hash':
+        return left.join(right, left_on=left_on, right_on=right_on, how=how,
+                         coalesce=True, suffix='_right')
+    if strategy == 'partitioned':
+        return partitioned_join(left, right, left_on, right_on, how, spill_dir, partitions)
+    raise ValueError(f"Strategi join tidak dikenal: {strategy}")
+
+def _spill_partitions(lf, keys, names, folder, partitions):
+    """Hash-partition a LazyFrame on its keys into parquet files under ``folder``"""
+    import polars as pl
+
+    # Hash keys under common names so both sides of the join land in the same partition
+    bucket = pl.struct([pl.col(key).alias(name) for key, name in zip(keys, names)]).hash(seed=0) % partitions
+    lf.sink_parquet(
+        pl.PartitionBy(folder, key={PARTITION_COLUMN: bucket}, include_key=False),
+        mkdir=True
+    )
+
+def _scan_partition(folder, i, schema):
+    import polars as pl
+
+    path = os.path.join(folder, f"{PARTITION_COLUMN}={i}")
+    if not os.path.isdir(path):
+        return pl.LazyFrame(schema=schema)
+    return pl.scan_parquet(os.path.join(path, '*.parquet'))
+
+def _build_lock(path):
+    with _build_locks_guard:
+        return _build_locks.setdefault(path, threading.Lock())
+
+def _build_partitioned(left, right, left_on, right_on, how, folder, partitions):
+    """Spill both sides under ``folder`` and join every partition pair into ``folder/output``"""
+    left_folder = os.path.join(folder, 'left')
+    right_folder = os.path.join(folder, 'right')
+    _spill_partitions(left, left_on, left_on, left_folder, partitions)
+    _spill_partitions(right, right_on, left_on, right_folder, partitions)
+
+    left_schema = left.collect_schema()
+    right_schema = right.collect_schema()
+    output = os.path.join(folder, 'output')
+    os.makedirs(output, exist_ok=True)
+    for i in range(partitions):
+        part = _scan_partition(left_folder, i, left_schema).join(
+            _scan_partition(right_folder, i, right_schema),
+            left_on=left_on, right_on=right_on, how=how, coalesce=True, suffix='_right'
+        )
+        part.sink_parquet(os.path.join(output, f"part-{i:05d}.parquet"))
+
+    # Inputs are no longer needed once every partition has been joined
+    shutil.rmtree(left_folder, ignore_errors=True)
+    shutil.rmtree(right_folder, ignore_errors=True)
+
+def partitioned_join(left, right, left_on, right_on, how, spill_dir, partitions):
+    """Grace hash join: spill both sides to disk by key hash, join partition by partition
+
+    ``spill_dir`` only exists once its output is complete; it is reused as is.
+    """
+    import polars as pl
+
+    with _build_lock(spill_dir):
+        if os.path.isdir(spill_dir):
+            os.utime(spill_dir)
+        else:
+            building = f"{spill_dir}.building-{uuid.uuid4().hex[:8]}"
+            try:
+                _build_partitioned(left, right, left_on, right_on, how, building, partitions)
+                os.replace(building, spill_dir)
+            except OSError:
+                # Another process finished the same plan first; keep its output
+                if not os.path.isdir(spill_dir):
+                    raise
+            finally:
+                shutil.rmtree(building, ignore_errors=True)
+
+    return pl.scan_parquet(os.path.join(spill_dir, 'output', '*.parquet'))
+
+def prune_spill(root, max_age):
+    """Remove join outputs under ``root/<session>/`` unused for ``max_age`` seconds"""
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age
+    for session in os.scandir(root):
+        if not session.is_dir():
+            continue
+        for entry in os.scandir(session.path):
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        try:
+            os.rmdir(session.path)
+        except OSError:
+            pass  # still has recent outputs
@@ -0,0 +1,578 @@
+"""Recorded cleaning pipeline for the data-preparation commands (16-25).
+
+Each cleaning command appends a step to a ``CleaningPipeline`` instead of
+touching the session DataFrame. The steps are plain JSON-able dicts, so a plan
+can be downloaded and replayed on next month's file. Execution builds a single
+polars ``LazyFrame`` over the uploaded file, so every step is fused into one
+query and runs in one streaming pass; export sinks straight to CSV/Parquet
+without materializing the final frame. Merges with attached datasets are
+delegated to joins.py, which can spill to disk when inputs exceed memory.
+
+polars is imported inside the functions to keep the app's cold start light.
+"""
+import json
+import os
+import tempfile
+from datetime import date, datetime
+
+from joins import JOIN_STRATEGIES, JOIN_TYPES
+
+CLEANING_OPS = ('drop_duplicates', 'rename', 'cast', 'filter', 'derive', 'encode', 'normalize', 'merge')
+
+CAST_TYPES = ('int', 'float', 'str', 'date', 'datetime', 'bool')
+FILTER_OPERATORS = ('==', '!=', '>', '>=', '<', '<=', 'contains')
+DERIVE_OPERATORS = ('+', '-', '*', '/')
+ENCODE_METHODS = ('label', 'onehot')
+NORMALIZE_METHODS = ('minmax', 'zscore')
+EXPORT_FORMATS = ('csv', 'parquet')
+
+# Text spellings accepted when casting a text column to bool; anything else becomes null
+BOOL_STRINGS = {
+    'true': True, 'false': False,
+    '1': True, '0': False,
+    'yes': True, 'no': False,
+    'ya': True, 'tidak': False,
+    'y': True, 'n': False
+}
+
+# Rows run through the plan when a step is recorded, to catch run-time errors
+PREVIEW_ROWS = 100
+
+# ============================================================================
+# STEP VALIDATION
+# ============================================================================
+def _is_name(value):
+    return isinstance(value, str) and value != ''
+
+def _is_names(value):
+    return isinstance(value, list) and bool(value) and all(_is_name(name) for name in value)
+
+def _is_scalar(value):
+    return isinstance(value, (str, int, float))
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _one_of(options):
+    return lambda value: isinstance(value, str) and value in options
+
+def _is_operand(value):
+    """Right-hand side of a derive step: ``{'column': name}`` or ``{'value': number}``"""
+    if not isinstance(value, dict) or len(value) != 1:
+        return False
+    if 'column' in value:
+        return _is_name(value['column'])
+    return 'value' in value and _is_number(value['value'])
+
+# Parameters every step of an op must carry and their checks; applied on record
+# and on plan upload, so a malformed plan never reaches apply() or describe_step()
+STEP_PARAMS = {
+    'drop_duplicates': {},
+    'rename': {
+        'mapping': lambda value: (isinstance(value, dict) and bool(value)
+                                  and all(_is_name(old) and _is_name(new) for old, new in value.items()))
+    },
+    'cast': {'column': _is_name, 'dtype': _one_of(CAST_TYPES)},
+    'filter': {'column': _is_name, 'operator': _one_of(FILTER_OPERATORS), 'value': _is_scalar},
+    'derive': {'name': _is_name, 'left': _is_name, 'operator': _one_of(DERIVE_OPERATORS), 'right': _is_operand},
+    'encode': {
+        'column': _is_name,
+        'method': _one_of(ENCODE_METHODS),
+        'categories': lambda value: isinstance(value, list) and all(_is_scalar(item) for item in value)
+    },
+    'normalize': {'column': _is_name, 'method': _one_of(NORMALIZE_METHODS)},
+    'merge': {
+        'dataset': _is_name,
+        'left_on': _is_names,
+        'right_on': _is_names,
+        'how': _one_of(JOIN_TYPES),
+        'strategy': _one_of(JOIN_STRATEGIES),
+        'partitions': lambda value: isinstance(value, int) and not isinstance(value, bool) and value >= 1
+    }
+}
+
+def validate_step(step):
+    """Raise ValueError unless ``step`` is a known op with well-formed parameters"""
+    if not isinstance(step, dict):
+        raise ValueError("Setiap langkah harus berupa objek JSON")
+    op = step.get('op')
+    if not isinstance(op, str) or op not in CLEANING_OPS:
+        raise ValueError(f"Operasi cleaning tidak dikenal: {op}")
+    missing = [key for key in STEP_PARAMS[op] if key not in step]
+    if missing:
+        raise ValueError(f"Langkah {op} tidak lengkap, parameter hilang: {', '.join(missing)}")
+    for key, check in STEP_PARAMS[op].items():
+        if not check(step[key]):
+            raise ValueError(f"Parameter {key} pada langkah {op} tidak valid: {step[key]!r}")
+    subset = step.get('subset')
+    if op == 'drop_duplicates' and subset is not None and not (subset == [] or _is_names(subset)):
+        raise ValueError(f"Parameter subset pada langkah {op} tidak valid: {subset!r}")
+    if op == 'merge' and len(step['left_on']) != len(step['right_on']):
+        raise ValueError("Jumlah kolom kunci kiri dan kanan harus sama")
+    return step
+
+# ============================================================================
+# FILTER VALUES
+# ============================================================================
+def parse_filter_value(value, kind):
+    """Parse a filter value typed by the user for a column of the given kind
+
+    ``kind`` is 'numeric', 'date', 'datetime', 'bool' or 'string'. The filter
+    engine (filters.py) uses the same rules, so a condition selects the same
+    rows whether it runs as an active filter or as a cleaning step.
+    """
+    text = str(value).strip()
+    if not text:
+        raise ValueError("Nilai filter tidak boleh kosong")
+    try:
+        if kind == 'numeric':
+            return float(text)
+        if kind == 'date':
+            return date.fromisoformat(text)
+        if kind == 'datetime':
+            return datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Nilai filter '{text}' tidak sesuai tipe kolom ({kind})") from None
+    if kind == 'bool':
+        if text.lower() not in ('true', 'false'):
+            raise ValueError(f"Nilai filter '{text}' harus true atau false")
+        return text.lower() == 'true'
+    return text
+
+def match_time_zone(value, time_zone):
+    """Put a parsed datetime filter value in a column's time zone
+
+    A value without an offset is read as wall time in the column's zone; one
+    with an offset is converted to it. Against a column without a zone the
+    offset is dropped and the wall time kept.
+    """
+    if time_zone is None:
+        return value.replace(tzinfo=None)
+    from zoneinfo import ZoneInfo
+
+    zone = ZoneInfo(time_zone)
+    return value.replace(tzinfo=zone) if value.tzinfo is None else value.astimezone(zone)
+
+def polars_filter_kind(dtype):
+    """Filter value kind of a polars dtype"""
+    import polars as pl
+
+    if dtype.is_numeric():
+        return 'numeric'
+    if dtype == pl.Date:
+        return 'date'
+    if dtype == pl.Datetime:
+        return 'datetime'
+    if dtype == pl.Boolean:
+        return 'bool'
+    return 'string'
+
+class CleaningPipeline:
+    """Ordered, replayable list of cleaning steps
+
+    ``datasets`` maps attached dataset names to file paths. Merge steps refer
+    to datasets by name, so a replayed plan picks up re-attached files.
+    """
+
+    def __init__(self, steps=None, datasets=None, spill_dir=None):
+        self.steps = list(steps or [])
+        self.datasets = dict(datasets or {})
+        self.spill_dir = spill_dir or tempfile.gettempdir()
+
+    def add_step(self, op, **params):
+        """Record a cleaning step; nothing is executed until the plan is applied"""
+        step = validate_step({'op': op, **params})
+        self.steps.append(step)
+        return step
+
+    def copy(self):
+        """Independent plan with the same steps, e.g. for a background job"""
+        return CleaningPipeline(self.steps, self.datasets, self.spill_dir)
+
+    def undo(self):
+        """Remove the last recorded step"""
+        return self.steps.pop() if self.steps else None
+
+    def reset(self):
+        self.steps = []
+
+    @property
+    def signature(self):
+        """Stable key for caching results of this exact plan"""
+        return json.dumps(self.steps, sort_keys=True, default=str)
+
+    def to_json(self):
+        return json.dumps({'steps': self.steps}, indent=2, default=str)
+
+    @classmethod
+    def from_json(cls, text):
+        plan = json.loads(text)
+        if not isinstance(plan, dict) or not isinstance(plan.get('steps', []), list):
+            raise ValueError("Format rencana harus berupa objek dengan daftar 'steps'")
+        return cls([validate_step(step) for step in plan.get('steps', [])])
+
+    def apply(self, lf, execute=False, sample=None):
+        """Chain every step onto a LazyFrame
+
+        No data is read here. Partitioned merges are planned as hash joins,
+        which have the same schema, unless ``execute`` is set: ``collect`` and
+        ``sink`` set it to build them on disk first (see joins.py). ``sample``
+        limits attached datasets to their first rows (see ``preview``).
+        """
+        for step in self.steps:
+            if step['op'] == 'merge':
+                lf = self._merge(lf, step, execute, sample)
+            else:
+                lf = _STEP_FUNCTIONS[step['op']](lf, step)
+        return lf
+
+    def _merge(self, lf, step, execute, sample=None):
+        """Join with an attached dataset; partitioned joins only run (once) when executed"""
+        import joins
+
+        right = self.scan_attachment(step['dataset'])
+        if sample is not None:
+            right = right.head(sample)
+        if step['strategy'] != 'partitioned' or not execute:
+            return joins.join(lf, right, step['left_on'], step['right_on'], step['how'])
+        key = joins.plan_key(lf, right, step['left_on'], step['right_on'], step['how'], step['partitions'])
+        return joins.join(lf, right, step['left_on'], step['right_on'], step['how'],
+                          'partitioned', os.path.join(self.spill_dir, key), step['partitions'])
+
+    def scan_attachment(self, name):
+        """LazyFrame over an attached dataset"""
+        if name not in self.datasets:
+            raise ValueError(f"Dataset tambahan belum diupload: {name}")
+        return scan_dataset(self.datasets[name])
+
+    def preview(self, lf, rows=PREVIEW_ROWS):
+        """Run the plan on the first rows of every input
+
+        Cheap check for errors the schema does not show, such as casts that
+        are not supported for the column's data.
+        """
+        return self.apply(lf.head(rows), sample=rows).collect()
+
+    def collect(self, lf):
+        """Run the fused plan in one streaming pass and return a polars DataFrame
+
+        Partitioned merges run here, so call this from a background job.
+        """
+        return self.apply(lf, execute=True).collect(engine='streaming')
+
+    def sink(self, lf, path):
+        """Stream the plan's output to CSV/Parquet without building it in memory
+
+        Partitioned merges run here, so call this from a background job.
+        """
+        lf = self.apply(lf, execute=True)
+        if path.endswith('.parquet'):
+            lf.sink_parquet(path)
+        else:
+            lf.sink_csv(path)
+        return path
+
+# ============================================================================
+# SOURCES
+# ============================================================================
+_csv_schemas = {}
+MAX_CACHED_SCHEMAS = 256
+
+def _csv_schema(path):
+    """Column types of a CSV file, inferred from every row once per file version
+
+    Inferring from the first 100 rows only fails the scan when a column turns
+    fractional (or textual) further down; inferring from all rows is a full
+    pass, so it is cached rather than repeated on every schema resolution.
+    """
+    import polars as pl
+
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _csv_schemas:
+        if len(_csv_schemas) >= MAX_CACHED_SCHEMAS:
+            _csv_schemas.clear()
+        _csv_schemas[key] = pl.scan_csv(path, try_parse_dates=True, infer_schema_length=None).collect_schema()
+    return _csv_schemas[key]
+
+def scan_dataset(path):
+    """LazyFrame over a dataset file on disk"""
+    import polars as pl
+
+    if path.endswith('.csv'):
+        return pl.scan_csv(path, schema=_csv_schema(path))
+    if path.endswith('.parquet'):
+        return pl.scan_parquet(path)
+    # Excel cannot be scanned; convert it to parquet once and scan that, so the
+    # plan names a file on disk (partitioned join outputs are cached by plan)
+    parquet_path = f"{path}.parquet"
+    if not os.path.exists(parquet_path) or os.path.getmtime(parquet_path) < os.path.getmtime(path):
+        fd, tmp_path = tempfile.mkstemp(suffix='.parquet', dir=os.path.dirname(path) or '.')
+        os.close(fd)
+        try:
+            pl.read_excel(path, engine='openpyxl').write_parquet(tmp_path)
+            os.replace(tmp_path, parquet_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return pl.scan_parquet(parquet_path)
+
+def schema_column_types(schema):
+    """Numeric, categorical and date column names from a polars schema"""
+    import polars as pl
+
+    return {
+        'columns': list(schema.names()),
+        'numeric_columns': [name for name, dtype in schema.items() if dtype.is_numeric()],
+        'categorical_columns': [name for name, dtype in schema.items() if dtype in (pl.String, pl.Categorical)],
+        'date_columns': [name for name, dtype in schema.items() if dtype in (pl.Date, pl.Datetime)]
+    }
+
+def distinct_values(lf, column):
+    """Sorted distinct non-null values of a column, used to freeze encodings"""
+    import polars as pl
+
+    values = lf.select(pl.col(column).drop_nulls().unique().sort()).collect(engine='streaming')
+    return values.to_series().to_list()
+
+# ============================================================================
+# STEP FUNCTIONS
+# ============================================================================
+def _drop_duplicates(lf, step):
+    return lf.unique(subset=step.get('subset') or None, keep='first', maintain_order=True)
+
+def _rename(lf, step):
+    return lf.rename(step['mapping'])
+
+def _cast(lf, step):
+    import polars as pl
+
+    column, dtype = step['column'], step['dtype']
+    col = pl.col(column)
+    if dtype == 'int':
+        expr = col.cast(pl.Int64, strict=False)
+    elif dtype == 'float':
+        expr = col.cast(pl.Float64, strict=False)
+    elif dtype == 'str':
+        expr = col.cast(pl.String)
+    elif dtype == 'bool':
+        if lf.collect_schema()[column] == pl.String:
+            # Text has no cast to Boolean; map the usual spellings instead
+            expr = col.str.strip_chars().str.to_lowercase().replace_strict(
+                BOOL_STRINGS, default=None, return_dtype=pl.Boolean)
+        else:
+            expr = col.cast(pl.Boolean, strict=False)
+    elif dtype == 'date':
+        expr = col.cast(pl.String).str.to_date(strict=False)
+    elif dtype == 'datetime':
+        expr = col.cast(pl.String).str.to_datetime(strict=False)
+    else:
+        raise ValueError(f"Tipe data tidak didukung: {dtype}")
+    return lf.with_columns(expr.alias(column))
+
+def _filter(lf, step):
+    import polars as pl
+
+    column, operator = step['column'], step['operator']
+    col = pl.col(column)
+    dtype = lf.collect_schema()[column]
+    kind = polars_filter_kind(dtype)
+    if operator == 'contains' and kind != 'string':
+        raise ValueError("Operator 'contains' hanya untuk kolom kategorikal")
+    value = parse_filter_value(step['value'], kind)
+    if kind == 'datetime':
+        value = match_time_zone(value, dtype.time_zone)
+    if operator == 'contains':
+        return lf.filter(col.cast(pl.String).str.contains(value, literal=True))
+
+    # Compare in the column's own type family so "100.5" works against an int column
+    literal = pl.lit(value)
+    comparisons = {
+        '==': col == literal,
+        '!=': col != literal,
+        '>': col > literal,
+        '>=': col >= literal,
+        '<': col < literal,
+        '<=': col <= literal
+    }
+    return lf.filter(comparisons[operator])
+
+def _derive(lf, step):
+    import polars as pl
+
+    left = pl.col(step['left'])
+    right = step['right']
+    right = pl.col(right['column']) if 'column' in right else pl.lit(right['value'])
+    operators = {
+        '+': left + right,
+        '-': left - right,
+        '*': left * right,
+        '/': left / right
+    }
+    return lf.with_columns(operators[step['operator']].alias(step['name']))
+
+def _encode(lf, step):
+    import polars as pl
+
+    column, categories = step['column'], step['categories']
+    if step['method'] == 'label':
+        codes = pl.col(column).replace_strict(categories, list(range(len(categories))), default=None)
+        return lf.with_columns(codes.alias(f"{column}_encoded"))
+    dummies = [
+        (pl.col(column) == category).cast(pl.Int8).fill_null(0).alias(f"{column}_{category}")
+        for category in categories
+    ]
+    return lf.with_columns(dummies)
+
+def _normalize(lf, step):
+    import polars as pl
+
+    column = step['column']
+    col = pl.col(column).cast(pl.Float64)
+    if step['method'] == 'zscore':
+        expr = (col - col.mean()) / col.std()
+    else:
+        expr = (col - col.min()) / (col.max() - col.min())
+    return lf.with_columns(expr.alias(column))
+
+_STEP_FUNCTIONS = {
+    'drop_duplicates': _drop_duplicates,
+    'rename': _rename,
+    'cast': _cast,
+    'filter': _filter,
+    'derive': _derive,
+    'encode': _encode,
+    'normalize': _normalize
+}
+
+# ============================================================================
+# COMMAND HANDLERS
+# ============================================================================
+def describe_step(step):
+    """One-line human readable description of a step"""
+    op = step['op']
+    if op == 'drop_duplicates':
+        subset = step.get('subset')
+        return f"Hapus duplikat ({', '.join(subset) if subset else 'semua kolom'})"
+    if op == 'rename':
+        return 'Ganti nama: ' + ', '.join(f"{old} → {new}" for old, new in step['mapping'].items())
+    if op == 'cast':
+        return f"Ubah tipe {step['column']} → {step['dtype']}"
+    if op == 'filter':
+        return f"Filter {step['column']} {step['operator']} {step['value']}"
+    if op == 'derive':
+        right = step['right'].get('column', step['right'].get('value'))
+        return f"Kolom baru {step['name']} = {step['left']} {step['operator']} {right}"
+    if op == 'encode':
+        return f"Encoding {step['method']} pada {step['column']} ({len(step['categories'])} kategori)"
+    if op == 'normalize':
+        return f"Normalisasi {step['method']} pada {step['column']}"
+    if op == 'merge':
+        keys = ', '.join(f"{left} = {right}" for left, right in zip(step['left_on'], step['right_on']))
+        return f"Gabungkan dengan {step['dataset']} ({step['how']} join, {keys})"
+    return op
+
+def handle_cleaning_command(pipeline, source, op, params):
+    """Record a cleaning step and report the resulting plan"""
+    if op == 'encode':
+        params = dict(params, categories=distinct_values(pipeline.apply(source), params['column']))
+
+    step = pipeline.add_step(op, **params)
+    try:
+        # Resolving the schema validates the new step without reading any rows;
+        # a short preview catches what only fails on actual data
+        schema = pipeline.apply(source).collect_schema()
+        pipeline.preview(source)
+    except Exception:
+        pipeline.undo()
+        raise
+
+    return {
+        'answer': f'✅ Langkah cleaning ditambahkan: {describe_step(step)}',
+        'insights': [
+            f'🧹 Total langkah dalam rencana: {len(pipeline.steps)}',
+            f'📈 Kolom setelah cleaning: {len(schema)}',
+            '⚡ Rencana dijalankan sekaligus (lazy) saat dataset dibutuhkan',
+            '🔁 Rencana dapat diunduh dan dijalankan ulang pada file baru'
+        ],
+        'data': {
+            'step': step,
+            'columns': {name: str(dtype) for name, dtype in schema.items()}
+        }
+    }
+
+def handle_merge_command(pipeline, source, params, memory_limit):
+    """Record a join with an attached dataset and report its cardinality"""
+    import joins
+
+    left = pipeline.apply(source)
+    right = pipeline.scan_attachment(params['dataset'])
+    left_on, right_on, how = params['left_on'], params['right_on'], params['how']
+    if not left_on or len(left_on) != len(right_on):
+        raise ValueError("Pilih kolom kunci dengan jumlah yang sama di kedua dataset")
+
+    # Per-key counts give cardinality, unmatched keys and input sizes in one aggregated pass
+    stats = joins.join_stats(left, right, left_on, right_on)
+    left_bytes = joins.estimate_bytes(left.collect_schema(), stats['left_rows'])
+    right_bytes = joins.estimate_bytes(right.collect_schema(), stats['right_rows'])
+    strategy, partitions = joins.plan_join(left_bytes, right_bytes, memory_limit)
+
+    step = pipeline.add_step('merge', dataset=params['dataset'], left_on=left_on, right_on=right_on,
+                             how=how, strategy=strategy, partitions=partitions)
+    try:
+        schema = pipeline.apply(source).collect_schema()
+    except Exception:
+        pipeline.undo()
+        raise
+
+    output_rows = joins.estimated_rows(stats, how)
+    insights = [
+        f"🔗 Kardinalitas join: {stats['cardinality']} ({how} join)",
+        f"📊 Baris: {stats['left_rows']:,} (utama) × {stats['right_rows']:,} ({params['dataset']}) → {output_rows:,}",
+        f"✅ Kunci cocok: {stats['matched_keys']:,}",
+        f"❗ Kunci tanpa pasangan di {params['dataset']}: {stats['unmatched_left_keys']:,} ({stats['unmatched_left_rows']:,} baris)",
+        f"❗ Kunci {params['dataset']} tanpa pasangan di dataset utama: {stats['unmatched_right_keys']:,} ({stats['unmatched_right_rows']:,} baris)"
+    ]
+    if strategy == 'partitioned':
+        insights.append(f'💾 Data melebihi batas memori, join dijalankan per partisi di disk ({partitions} partisi)')
+    else:
+        insights.append('⚡ Hash join di memori, digabung ke rencana cleaning secara lazy')
+    if stats['cardinality'] == 'N:N':
+        insights.append('⚠️ Kunci duplikat di kedua sisi, hasil join dapat membengkak')
+
+    return {
+        'answer': f'✅ Langkah cleaning ditambahkan: {describe_step(step)}',
+        'insights': insights,
+        'data': {
+            'step': step,
+            'join_stats': dict(stats, estimated_output_rows=output_rows),
+            'columns': {name: str(dtype) for name, dtype in schema.items()}
+        }
+    }
+
+def handle_export_command(pipeline, source, export_folder, filename, file_format):
+    """Stream the cleaned dataset to a new file
+
+    ``export_folder`` should be private to the session; the file name is only
+    unique within it.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Format ekspor tidak didukung: {file_format}")
+
+    os.makedirs(export_folder, exist_ok=True)
+    base = os.path.splitext(os.path.basename(filename))[0]
+    path = pipeline.sink(source, os.path.join(export_folder, f"{base}_cleaned.{file_format}"))
+
+    return {
+        'answer': f'✅ Dataset hasil cleaning diekspor ke {os.path.basename(path)}',
+        'insights': [
+            f'🧹 Langkah cleaning diterapkan: {len(pipeline.steps)}',
+            f'💾 Ukuran file: {os.path.getsize(path) / 1024:,.1f} KB',
+            '⚡ Data ditulis secara streaming tanpa membangun dataset di memori'
+        ],
+        'data': {
+            'path': path,
+            'format': file_format,
+            'steps': [describe_step(step) for step in pipeline.steps]
+        }
+    }
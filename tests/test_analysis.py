@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import perform_analysis
+from commands import CLEANING_COMMANDS, FILTER_COMMAND, MANUAL_QUESTIONS
+
+ANALYSIS_COMMANDS = [command for command in MANUAL_QUESTIONS
+                     if command not in CLEANING_COMMANDS and command != FILTER_COMMAND]
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'customer_id': rng.integers(0, 20, 100),
+        'sales': rng.random(100) * 100,
+        'region': rng.choice(['Jakarta', 'Bandung'], 100)
+    })
+
+@pytest.mark.parametrize('command', ANALYSIS_COMMANDS)
+def test_filtered_to_no_rows(sales, command):
+    result = perform_analysis(sales.iloc[:0], command, 'sales', 'region')
+    assert '0 baris' in result['answer']
+
+@pytest.mark.parametrize('command', ANALYSIS_COMMANDS)
+def test_single_row(sales, command):
+    result = perform_analysis(sales.iloc[:1], command, 'sales', 'region')
+    assert result['answer']
@@ -0,0 +1,32 @@
+import os
+
+import pandas as pd
+
+from dataset import column_types, prune_folders, read_dataset, touch_folder
+
+def test_type_change_after_first_rows(tmp_path):
+    path = tmp_path / 'sales.csv'
+    rows = ''.join(f"{i},Jakarta,2024-01-{i % 28 + 1:02d}\n" for i in range(200))
+    path.write_text('qty,region,day\n' + rows + '1.5,Bandung,2024-02-01\n')
+
+    df = read_dataset(str(path))
+    assert len(df) == 201
+    assert df['qty'].iloc[-1] == 1.5
+    assert pd.api.types.is_datetime64_any_dtype(df['day'])
+    assert column_types(df) == {'numeric_columns': ['qty'], 'categorical_columns': ['region'], 'date_columns': ['day']}
+
+def test_excel_upload(tmp_path):
+    path = tmp_path / 'sales.xlsx'
+    pd.DataFrame({'qty': [1, 2], 'region': ['a', 'b']}).to_excel(path, index=False)
+    assert read_dataset(str(path))['qty'].tolist() == [1, 2]
+
+def test_prune_folders_keeps_touched_sessions(tmp_path):
+    idle, active = tmp_path / 'idle', tmp_path / 'active'
+    for folder in (idle, active):
+        folder.mkdir()
+        (folder / 'sales.csv').write_text('qty\n1\n')
+        os.utime(folder, (0, 0))
+    touch_folder(str(active))
+    prune_folders(str(tmp_path), 60)
+    assert not idle.exists()
+    assert (active / 'sales.csv').exists()
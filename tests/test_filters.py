@@ -0,0 +1,117 @@
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+
+import filters
+from filters import FilterEngine, build_index
+from pipeline import CleaningPipeline
+
+N = 2000
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(0)
+    amount = rng.integers(0, 500, N).astype(float)
+    amount[::37] = np.nan
+    region = rng.choice(['Jakarta', 'Bandung', 'Surabaya', 'Medan'], N).astype(object)
+    region[::41] = None
+    lf = pl.LazyFrame({
+        'row': np.arange(N),
+        'qty': rng.integers(0, 200, N),
+        'amount': amount,
+        'region': region.tolist(),
+        'code': [f"C{i:05d}" for i in rng.permutation(N)],
+        'day': [dt.date(2024, 1, 1) + dt.timedelta(days=int(d)) for d in rng.integers(0, 366, N)],
+        'active': rng.random(N) < 0.3
+    }, nan_to_null=True)
+    return lf, lf.collect().to_pandas()
+
+CONDITIONS = [
+    ('qty', '>', '100.5'),
+    ('qty', '==', '42'),
+    ('qty', '<=', '7'),
+    ('amount', '!=', '250'),
+    ('amount', '>=', '499'),
+    ('region', '==', 'Bandung'),
+    ('region', '!=', 'Medan'),
+    ('region', '<', 'Jakarta'),
+    ('region', 'contains', 'an'),
+    ('code', '>', 'C01000'),
+    ('code', 'contains', '99'),
+    ('day', '>=', '2024-06-01'),
+    ('day', '==', '2024-02-29'),
+    ('active', '==', 'true'),
+    ('active', '!=', 'False')
+]
+
+def _pipeline_rows(lf, conditions):
+    pipeline = CleaningPipeline()
+    for column, operator, value in conditions:
+        pipeline.add_step('filter', column=column, operator=operator, value=value)
+    return pipeline.collect(lf)['row'].to_numpy()
+
+def _conditions(*items):
+    return [{'column': c, 'operator': o, 'value': v} for c, o, v in items]
+
+@pytest.mark.parametrize('condition', CONDITIONS, ids=lambda c: ' '.join(c))
+def test_engine_matches_pipeline_filter(frame, monkeypatch, condition):
+    lf, df = frame
+    # Force the scan fallback for the high-cardinality code column
+    monkeypatch.setattr(filters, 'MAX_BITMAP_CATEGORIES', 100)
+    engine = FilterEngine(df)
+    positions = engine.positions(_conditions(condition))
+    np.testing.assert_array_equal(df['row'].to_numpy()[positions], _pipeline_rows(lf, [condition]))
+
+def test_engine_matches_pandas_masks(frame):
+    _, df = frame
+    engine = FilterEngine(df)
+    view = engine.view(_conditions(('qty', '>=', '50'), ('region', '==', 'Jakarta'), ('day', '<', '2024-09-01')))
+    expected = df[(df['qty'] >= 50) & (df['region'] == 'Jakarta') & (df['day'] < '2024-09-01')]
+    assert view.index.tolist() == expected.index.tolist()
+
+def test_index_kinds(frame, monkeypatch):
+    _, df = frame
+    monkeypatch.setattr(filters, 'MAX_BITMAP_CATEGORIES', 100)
+    assert build_index(df['qty']).kind == 'sorted'
+    assert build_index(df['day']).kind == 'sorted'
+    assert build_index(df['region']).kind == 'bitmap'
+    assert build_index(df['active']).kind == 'bitmap'
+    assert build_index(df['code']).kind == 'scan'
+
+@pytest.mark.parametrize('condition', [('qty', '>', ''), ('qty', '==', 'abc'), ('day', '>', 'kemarin'),
+                                       ('active', '==', 'ya'), ('qty', 'contains', '1')])
+def test_invalid_values_rejected(frame, condition):
+    lf, df = frame
+    with pytest.raises(ValueError):
+        FilterEngine(df).positions(_conditions(condition))
+    with pytest.raises(ValueError):
+        _pipeline_rows(lf, [condition])
+
+def test_only_latest_view_is_kept(frame):
+    _, df = frame
+    engine = FilterEngine(df)
+    first = _conditions(('qty', '>', '10'))
+    view = engine.view(first)
+    assert engine.view(first) is view
+    engine.view(_conditions(('qty', '>', '20')))
+    assert engine.latest[0] != engine.mask(first)[0]
+    assert len(engine.masks) == 2
+
+@pytest.mark.parametrize('condition', [('ts', '>', '2024-02-01'), ('ts', '<=', '2024-03-01T09:00:00+07:00'),
+                                       ('ts', '==', '2024-01-01 03:00:00')])
+def test_time_zone_aware_column(tmp_path, condition):
+    from dataset import read_dataset
+    from pipeline import scan_dataset
+
+    path = tmp_path / 'events.csv'
+    path.write_text('row,ts\n0,2024-01-01T10:00:00+07:00\n1,2024-03-01T09:00:00+07:00\n'
+                    '2,2024-03-01T10:00:00+07:00\n3,\n')
+    lf, df = scan_dataset(str(path)), read_dataset(str(path))
+    assert lf.collect_schema()['ts'].time_zone == 'UTC'
+
+    positions = FilterEngine(df).positions(_conditions(condition))
+    expected = _pipeline_rows(lf, [condition])
+    assert len(expected) > 0
+    np.testing.assert_array_equal(df['row'].to_numpy()[positions], expected)
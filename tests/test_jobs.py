@@ -0,0 +1,144 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import perform_analysis
+from jobs import JobCancelled, JobRunner
+
+def _wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.active and time.time() < deadline:
+        time.sleep(0.01)
+    assert not job.active
+
+def _blocking(release):
+    def body(job):
+        while not release.wait(0.01):
+            job.update_progress(0.5, 'menunggu')
+        return 'selesai'
+    return body
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(max_workers=1, max_per_owner=2, result_ttl=60)
+    yield runner
+    runner.executor.shutdown(wait=False, cancel_futures=True)
+
+def test_result_is_kept(runner):
+    job = runner.submit('a', 'tambah', lambda job, x, y: x + y, 1, 2)
+    _wait(job)
+    assert (job.status, job.result, job.progress) == ('done', 3, 1.0)
+    assert runner.jobs_for('a') == [job]
+
+def test_failure_is_reported(runner):
+    job = runner.submit('a', 'gagal', lambda job: 1 / 0)
+    _wait(job)
+    assert job.status == 'failed'
+    assert 'division' in job.error
+
+def test_per_owner_cap(runner):
+    release = threading.Event()
+    runner.submit('a', 'satu', _blocking(release))
+    runner.submit('a', 'dua', _blocking(release))
+    with pytest.raises(RuntimeError):
+        runner.submit('a', 'tiga', _blocking(release))
+    # Other sessions are not affected by one session's cap
+    other = runner.submit('b', 'lain', lambda job: 'ok')
+    release.set()
+    _wait(other)
+    assert other.result == 'ok'
+
+def test_cancel_running_and_queued(runner):
+    release = threading.Event()
+    running = runner.submit('a', 'jalan', _blocking(release))
+    queued = runner.submit('a', 'antri', lambda job: 'tidak pernah')
+    while running.status != 'running':
+        time.sleep(0.01)
+
+    assert runner.cancel(queued.id)
+    assert queued.status == 'cancelled'
+    assert runner.cancel(running.id)
+    _wait(running)
+    assert running.status == 'cancelled'
+    assert running.result is None
+    assert not runner.cancel(running.id)
+
+def test_finished_jobs_expire(runner):
+    runner.result_ttl = 0
+    job = runner.submit('a', 'lama', lambda job: 'ok')
+    _wait(job)
+    time.sleep(0.01)
+    runner.submit('b', 'baru', lambda job: 'ok')
+    assert runner.get(job.id) is None
+
+def test_prune_skips_job_without_finish_time(runner):
+    # A job whose status is final but whose finish time is not set yet must not break submit
+    job = runner.submit('a', 'selesai', lambda job: 'ok')
+    _wait(job)
+    job.finished = None
+    runner.submit('b', 'lain', lambda job: 'ok')
+    assert runner.get(job.id) is job
+
+def test_forget_keeps_active_jobs(runner):
+    release = threading.Event()
+    done = runner.submit('a', 'selesai', lambda job: 'ok')
+    _wait(done)
+    active = runner.submit('a', 'jalan', _blocking(release))
+    runner.forget('a')
+    assert runner.jobs_for('a') == [active]
+    release.set()
+
+@pytest.mark.parametrize('command', ['Cari korelasi antara variabel numerik dalam dataset',
+                                     'Deteksi outlier dalam data penjualan',
+                                     'Buat segmentasi pelanggan berdasarkan RFM'])
+def test_analysis_reports_progress_and_can_be_cancelled(command):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'customer_id': rng.integers(0, 50, 500), 'sales': rng.random(500), 'qty': rng.random(500)})
+    calls = []
+    perform_analysis(df, command, 'sales', None, progress=lambda fraction, message: calls.append(fraction))
+    assert calls and calls == sorted(calls)
+
+    def cancelled(fraction, message):
+        raise JobCancelled()
+    with pytest.raises(JobCancelled):
+        perform_analysis(df, command, 'sales', None, progress=cancelled)
+
+class _SlowPipeline:
+    signature = 'plan'
+
+    def __init__(self, started, release):
+        self.started, self.release, self.builds = started, release, 0
+
+    def collect(self, lf):
+        self.builds += 1
+        self.started.set()
+        self.release.wait(5)
+        return lf.collect()
+
+def test_cleaned_dataset_built_once_without_holding_the_lock(tmp_path):
+    from app import get_cleaned_dataset
+
+    path = tmp_path / 'sales.csv'
+    path.write_text('qty\n1\n2\n')
+    cache = {'lock': threading.Lock(), 'building': {}}
+    started, release = threading.Event(), threading.Event()
+    pipeline = _SlowPipeline(started, release)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_cleaned_dataset(cache, pipeline, str(path))))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+    # The session lock stays available (e.g. for the script thread) during the build
+    assert cache['lock'].acquire(timeout=1)
+    cache['lock'].release()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert pipeline.builds == 1
+    assert [df['qty'].tolist() for df in results] == [[1, 2], [1, 2]]
+    assert cache['building'] == {}
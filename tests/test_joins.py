@@ -0,0 +1,91 @@
+import os
+import time
+
+import polars as pl
+import pytest
+
+import joins
+
+def _frames(left_dtype=pl.Int64, right_dtype=pl.Int64):
+    left = pl.LazyFrame({
+        'id': pl.Series(list(range(200)) * 3, dtype=left_dtype),
+        'sales': [float(i) for i in range(600)]
+    })
+    right = pl.LazyFrame({
+        'cid': pl.Series(range(100, 300), dtype=right_dtype),
+        'segment': [f"S{i % 7}" for i in range(200)]
+    })
+    return left, right
+
+def _sorted(lf):
+    df = lf.collect()
+    return df.sort(df.columns, nulls_last=True)
+
+@pytest.mark.parametrize('how', joins.JOIN_TYPES)
+@pytest.mark.parametrize('dtypes', [(pl.Int64, pl.Int64), (pl.Int64, pl.Int32), (pl.Int16, pl.Float64)])
+def test_partitioned_matches_hash(tmp_path, how, dtypes):
+    left, right = _frames(*dtypes)
+    expected = _sorted(joins.join(left, right, ['id'], ['cid'], how, 'hash'))
+    actual = _sorted(joins.join(left, right, ['id'], ['cid'], how, 'partitioned',
+                                str(tmp_path / 'spill'), partitions=4))
+    assert actual.equals(expected)
+    assert actual.height == joins.estimated_rows(joins.join_stats(left, right, ['id'], ['cid']), how)
+
+def test_mismatched_dtypes_keep_matches():
+    left, right = _frames(pl.Int64, pl.Int32)
+    stats = joins.join_stats(left, right, ['id'], ['cid'])
+    assert stats['matched_keys'] == 100
+    assert stats['cardinality'] == 'N:1'
+
+def test_incompatible_key_dtypes_rejected():
+    left, right = _frames()
+    right = right.with_columns(pl.col('cid').cast(pl.String))
+    with pytest.raises(ValueError):
+        joins.join(left, right, ['id'], ['cid'])
+
+def test_partitioned_output_is_reused(tmp_path):
+    left, right = _frames()
+    spill_dir = str(tmp_path / 'spill' / 'session' / 'key')
+    joins.join(left, right, ['id'], ['cid'], 'inner', 'partitioned', spill_dir, 4).collect()
+    marker = os.path.join(spill_dir, 'output', 'marker')
+    open(marker, 'w').close()
+    joins.join(left, right, ['id'], ['cid'], 'inner', 'partitioned', spill_dir, 4).collect()
+    assert os.path.exists(marker)
+    assert os.listdir(os.path.dirname(spill_dir)) == ['key']
+
+def test_prune_spill_removes_stale_outputs(tmp_path):
+    root = tmp_path / 'spill'
+    stale = root / 'a' / 'old'
+    fresh = root / 'b' / 'new'
+    stale.mkdir(parents=True)
+    fresh.mkdir(parents=True)
+    old = time.time() - 120
+    os.utime(stale, (old, old))
+    joins.prune_spill(str(root), 60)
+    assert not (root / 'a').exists()
+    assert fresh.exists()
+
+def test_plan_join_strategy():
+    assert joins.plan_join(10, 100, 50) == ('hash', 1)
+    strategy, partitions = joins.plan_join(1000, 2000, 100)
+    assert strategy == 'partitioned'
+    assert joins.MIN_PARTITIONS <= partitions <= joins.MAX_PARTITIONS
+
+def test_partitioned_merge_only_builds_when_collected(tmp_path):
+    from pipeline import CleaningPipeline, handle_merge_command, scan_dataset
+
+    left, right = _frames()
+    left.collect().write_csv(tmp_path / 'sales.csv')
+    right.collect().write_csv(tmp_path / 'customers.csv')
+    spill = tmp_path / 'spill'
+    pipeline = CleaningPipeline(datasets={'customers': str(tmp_path / 'customers.csv')}, spill_dir=str(spill))
+    source = scan_dataset(str(tmp_path / 'sales.csv'))
+
+    params = {'dataset': 'customers', 'left_on': ['id'], 'right_on': ['cid'], 'how': 'left'}
+    result = handle_merge_command(pipeline, source, params, memory_limit=100)
+    assert result['data']['step']['strategy'] == 'partitioned'
+    assert not spill.exists()
+
+    expected = _sorted(joins.join(left, right, ['id'], ['cid'], 'left'))
+    assert _sorted(pipeline.collect(source).lazy()).equals(expected)
+    assert len(list(spill.iterdir())) == 1
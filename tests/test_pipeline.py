@@ -0,0 +1,128 @@
+import datetime as dt
+
+import polars as pl
+import pytest
+
+from pipeline import CleaningPipeline, handle_cleaning_command, handle_export_command, scan_dataset
+
+@pytest.fixture
+def sales_csv(tmp_path):
+    path = tmp_path / 'sales_jan.csv'
+    pl.DataFrame({
+        'qty': [3, 1, 4, 1, 5],
+        'price': ['10.5', '20', '7.25', '20', 'x'],
+        'region': ['Jakarta', 'Bandung', 'Jakarta', 'Bandung', 'Medan'],
+        'day': ['2024-01-05', '2024-01-09', '2024-02-01', '2024-01-09', '2024-03-15'],
+        'member': ['ya', 'tidak', 'TRUE', 'tidak', 'lainnya']
+    }).write_csv(path)
+    return str(path)
+
+def _run(source, *steps):
+    pipeline = CleaningPipeline()
+    for op, params in steps:
+        handle_cleaning_command(pipeline, source, op, params)
+    return pipeline, pipeline.collect(source)
+
+def test_cast(sales_csv):
+    _, df = _run(scan_dataset(sales_csv),
+                 ('cast', {'column': 'price', 'dtype': 'float'}),
+                 ('cast', {'column': 'qty', 'dtype': 'str'}),
+                 ('cast', {'column': 'member', 'dtype': 'bool'}))
+    assert df['price'].to_list() == [10.5, 20.0, 7.25, 20.0, None]
+    assert df['qty'].dtype == pl.String
+    assert df['member'].to_list() == [True, False, True, False, None]
+    assert df['day'].dtype == pl.Date
+
+def test_rename_and_drop_duplicates(sales_csv):
+    _, df = _run(scan_dataset(sales_csv),
+                 ('drop_duplicates', {'subset': []}),
+                 ('rename', {'mapping': {'qty': 'jumlah'}}))
+    assert df.height == 4
+    assert df.columns[0] == 'jumlah'
+
+def test_derive(sales_csv):
+    _, df = _run(scan_dataset(sales_csv),
+                 ('derive', {'name': 'qty2', 'left': 'qty', 'operator': '*', 'right': {'value': 2}}),
+                 ('derive', {'name': 'zero', 'left': 'qty', 'operator': '-', 'right': {'column': 'qty'}}))
+    assert df['qty2'].to_list() == [6, 2, 8, 2, 10]
+    assert df['zero'].to_list() == [0] * 5
+
+def test_encode(sales_csv):
+    pipeline, df = _run(scan_dataset(sales_csv),
+                        ('encode', {'column': 'region', 'method': 'label'}),
+                        ('encode', {'column': 'region', 'method': 'onehot'}))
+    assert pipeline.steps[0]['categories'] == ['Bandung', 'Jakarta', 'Medan']
+    assert df['region_encoded'].to_list() == [1, 0, 1, 0, 2]
+    assert df['region_Medan'].to_list() == [0, 0, 0, 0, 1]
+
+def test_normalize(sales_csv):
+    _, df = _run(scan_dataset(sales_csv),
+                 ('normalize', {'column': 'qty', 'method': 'minmax'}))
+    assert df['qty'].to_list() == [0.5, 0.0, 0.75, 0.0, 1.0]
+    _, df = _run(scan_dataset(sales_csv),
+                 ('normalize', {'column': 'qty', 'method': 'zscore'}))
+    assert abs(df['qty'].mean()) < 1e-12
+
+def test_filter_parses_value_per_type(sales_csv):
+    _, df = _run(scan_dataset(sales_csv),
+                 ('filter', {'column': 'qty', 'operator': '>', 'value': '1.5'}),
+                 ('filter', {'column': 'day', 'operator': '<', 'value': '2024-03-01'}))
+    assert df['qty'].to_list() == [3, 4]
+
+def test_step_failing_at_run_time_is_undone(sales_csv):
+    pipeline = CleaningPipeline()
+    with pytest.raises(Exception):
+        handle_cleaning_command(pipeline, scan_dataset(sales_csv), 'normalize', {'column': 'region', 'method': 'minmax'})
+    assert pipeline.steps == []
+
+def test_plan_replays_on_next_file(sales_csv, tmp_path):
+    pipeline, _ = _run(scan_dataset(sales_csv),
+                       ('cast', {'column': 'price', 'dtype': 'float'}),
+                       ('encode', {'column': 'region', 'method': 'label'}),
+                       ('filter', {'column': 'qty', 'operator': '>=', 'value': '2'}))
+
+    next_file = tmp_path / 'sales_feb.csv'
+    pl.DataFrame({'qty': [2, 1], 'price': ['5', '6'], 'region': ['Surabaya', 'Medan'],
+                  'day': ['2024-02-02', '2024-02-03'], 'member': ['ya', 'ya']}).write_csv(next_file)
+    replayed = CleaningPipeline.from_json(pipeline.to_json())
+    assert replayed.steps == pipeline.steps
+    df = replayed.collect(scan_dataset(str(next_file)))
+    # Encodings are frozen when recorded, so unseen categories become null
+    assert df.select('qty', 'price', 'region_encoded').rows() == [(2, 5.0, None)]
+
+@pytest.mark.parametrize('plan', [
+    '[]',
+    '{"steps": {}}',
+    '{"steps": [1]}',
+    '{"steps": [{"op": "explode"}]}',
+    '{"steps": [{"op": "cast", "column": "qty"}]}',
+    '{"steps": [{"op": "cast", "column": "qty", "dtype": "complex"}]}',
+    '{"steps": [{"op": "rename", "mapping": []}]}',
+    '{"steps": [{"op": "rename", "mapping": {"qty": ""}}]}',
+    '{"steps": [{"op": "filter", "column": "qty", "operator": "~", "value": "1"}]}',
+    '{"steps": [{"op": "derive", "name": "x", "left": "qty", "operator": "+", "right": 1}]}',
+    '{"steps": [{"op": "encode", "column": "region", "method": "label", "categories": "abc"}]}',
+    '{"steps": [{"op": "normalize", "column": "qty", "method": "log"}]}',
+    '{"steps": [{"op": "drop_duplicates", "subset": "qty"}]}',
+    '{"steps": [{"op": "merge", "dataset": "c", "left_on": "id", "right_on": ["cid"], '
+    '"how": "left", "strategy": "hash", "partitions": 1}]}',
+    '{"steps": [{"op": "merge", "dataset": "c", "left_on": ["id"], "right_on": ["cid"], '
+    '"how": "left", "strategy": "sort", "partitions": 1}]}',
+    'not json'
+])
+def test_malformed_plans_rejected(plan):
+    with pytest.raises(ValueError):
+        CleaningPipeline.from_json(plan)
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+def test_export(sales_csv, tmp_path, file_format):
+    pipeline = CleaningPipeline()
+    source = scan_dataset(sales_csv)
+    handle_cleaning_command(pipeline, source, 'filter', {'column': 'region', 'operator': '==', 'value': 'Jakarta'})
+    result = handle_export_command(pipeline, source, str(tmp_path / 'exports'), 'sales_jan.csv', file_format)
+
+    path = result['data']['path']
+    assert path.endswith(f"sales_jan_cleaned.{file_format}")
+    exported = scan_dataset(path).collect()
+    assert exported['qty'].to_list() == [3, 4]
+    assert exported['day'].to_list() == [dt.date(2024, 1, 5), dt.date(2024, 2, 1)]